@@ -0,0 +1,122 @@
+#Search benchmark - runs ChessAI on a fixed set of positions and reports how much it searched and where the time went
+#python bench.py [--depth <plies>] [--movetime <seconds>] [--seed <seed>] [--no-profile]
+#Move ordering breaks ties randomly, so the random module is seeded before each position - with a depth limit the node counts are the same on every run,
+#so the total nodes can be compared between versions to spot changes to the search
+import time
+import random
+import argparse
+from engine import GameState, ChessAI
+from perft import PERFT_SUITE
+
+#(name, FEN) of the positions searched - a mix of openings, middlegames, tactics and endgames
+BENCH_POSITIONS = (
+    ("start", PERFT_SUITE[0][1]),
+    ("italian", "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"),
+    ("kiwipete", PERFT_SUITE[1][1]),
+    ("middlegame", PERFT_SUITE[5][1]),
+    ("queensGambit", "rnbqkb1r/ppp2ppp/4pn2/3p2B1/2PP4/2N5/PP2PPPP/R2QKBNR b KQkq - 3 4"),
+    ("hangingQueen", "rnb1kbnr/pppp1ppp/8/4p1q1/4P3/3P4/PPP2PPP/RNBQKBNR w KQkq - 1 3"),
+    ("rookEndgame", PERFT_SUITE[2][1]),
+    ("pawnEndgame", "8/5k2/3p4/1p1Pp2p/pP2Pp1P/P4P1K/8/8 b - - 99 50"),
+)
+SECTIONS = ("move generation", "making moves", "encoding", "network") #parts of the search which are timed, everything else is counted as search overhead
+
+
+#Times the calls to the parts of the search in SECTIONS, by wrapping the functions the search calls
+class Profiler:
+
+    def __init__(self):
+        self.times = dict.fromkeys(SECTIONS, 0.0) #time spent in each section
+        self.calls = dict.fromkeys(SECTIONS, 0) #number of calls to each section
+        self.boards = 0 #number of boards evaluated by the network
+
+    #Returns the function wrapped so its calls are timed as part of the section
+    def wrap(self, section, function):
+        times, calls = self.times, self.calls
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            times[section] += time.perf_counter() - start
+            calls[section] += 1
+            return result
+        return timed
+
+    #Wraps the functions the AI's search calls (as attributes of the objects, so the classes themselves aren't changed)
+    def attach(self, ai, gameState):
+        gameState.getLegalMoves = self.wrap("move generation", gameState.getLegalMoves)
+        gameState.movePiece = self.wrap("making moves", gameState.movePiece)
+        gameState.revMove = self.wrap("making moves", gameState.revMove)
+        ai.encodeBoard = self.wrap("encoding", ai.encodeBoard)
+        evaluateBatch = self.wrap("network", ai.evaluateBatch)
+        def countBoards(boards):
+            self.boards += len(boards)
+            return evaluateBatch(boards)
+        ai.evaluateBatch = countBoards
+
+
+#Resets everything the AI has learnt from previous searches, so each position is searched the same way whatever was searched before it
+def resetAI(ai):
+    ai.transpositionTable.clear()
+    ai.evalCache.clear()
+    ai.killers.clear()
+    ai.history = [[0] * 64 for square in range(64)]
+
+
+#Searches each position (starting from the same random seed), printing the results for each one - returns the total nodes searched
+def runBenchmark(ai, positions=BENCH_POSITIONS, seed=0, profile=True):
+    totals = {"nodes": 0, "cutoffs": 0, "firstMoveCutoffs": 0, "time": 0.0}
+    profiler = Profiler() if profile else None
+    print("{:<14}{:>6}{:>6}{:>9}{:>9}{:>9}{:>8}{:>9}{:>9}".format("position", "move", "depth", "nodes", "nodes/s", "evals", "boards", "cutoffs", "time"))
+    for name, fen in positions:
+        gameState = GameState.fromFen(fen)
+        ai.game = ai.gameState = gameState
+        resetAI(ai)
+        evalCalls, boards = (profiler.calls["network"], profiler.boards) if profile else (0, 0)
+        if profile:
+            profiler.attach(ai, gameState)
+        random.seed(seed)
+        start = time.perf_counter()
+        move = ai.search()
+        elapsed = time.perf_counter() - start
+        if profile:
+            del ai.encodeBoard, ai.evaluateBatch #removes the wrappers, so the next position's are wrapped once rather than in layers
+            evalCalls, boards = profiler.calls["network"] - evalCalls, profiler.boards - boards
+        uci = "" if move is None else "{}{}{}{}".format("abcdefgh"[move[0][1]], 8 - move[0][0], "abcdefgh"[move[1][1]], 8 - move[1][0])
+        print("{:<14}{:>6}{:>6}{:>9}{:>9.0f}{:>9}{:>8}{:>9}{:>8.2f}s".format(name, uci, ai.completedDepth, ai.nodes, ai.nodes / max(elapsed, 1e-9),
+                                                                          evalCalls if profile else "-", boards if profile else "-", ai.cutoffs, elapsed))
+        totals["nodes"] += ai.nodes
+        totals["cutoffs"] += ai.cutoffs
+        totals["firstMoveCutoffs"] += ai.firstMoveCutoffs
+        totals["time"] += elapsed
+    print()
+    print("total nodes {}, {:.0f} nodes/s, {:.2f}s".format(totals["nodes"], totals["nodes"] / max(totals["time"], 1e-9), totals["time"]))
+    print("cutoffs {}, {:.1f}% by the first move".format(totals["cutoffs"], 100 * totals["firstMoveCutoffs"] / max(totals["cutoffs"], 1)))
+    if profile:
+        print("network evaluations {} ({} boards, {:.1f} per evaluation)".format(profiler.calls["network"], profiler.boards,
+                                                                                  profiler.boards / max(profiler.calls["network"], 1)))
+        print("time split (including the profiling overhead):")
+        for section in SECTIONS:
+            print("  {:<16}{:>8.2f}s{:>7.1f}%{:>10} calls".format(section, profiler.times[section], 100 * profiler.times[section] / max(totals["time"], 1e-9),
+                                                                  profiler.calls[section]))
+        other = totals["time"] - sum(profiler.times.values())
+        print("  {:<16}{:>8.2f}s{:>7.1f}%".format("search", other, 100 * other / max(totals["time"], 1e-9)))
+    return totals["nodes"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search benchmark for ChessAI")
+    parser.add_argument("--depth", type=int, default=4, help="depth searched in each position")
+    parser.add_argument("--movetime", type=float, help="time limit for each position in seconds (node counts then vary between runs)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the move ordering")
+    parser.add_argument("--workers", type=int, default=1, help="search worker processes (their nodes and cutoffs are counted, but not their time split)")
+    parser.add_argument("--no-profile", action="store_true", help="don't time the parts of the search (which slows it down slightly)")
+    args = parser.parse_args()
+    ai = ChessAI(GameState(), depth=args.depth, moveTime=args.movetime, workers=args.workers)
+    try:
+        runBenchmark(ai, seed=args.seed, profile=not args.no_profile)
+    finally:
+        ai.close()
+
+
+if __name__ == "__main__":
+    main()
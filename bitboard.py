@@ -0,0 +1,246 @@
+#Bitboard representation of a chess position, used internally by GameState
+#Each piece type/colour is stored as a single 64-bit integer with one bit set for every square it occupies
+#Squares are numbered 0-63 from a1 to h8 (the same ordering as python-chess), so square = (7-row)*8 + col
+import random
+
+WHITE, BLACK = 0, 1 #colour indexes (used to index occupied)
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6) #piece types, black pieces are offset by 6 (e.g. black rook = 6+ROOK)
+EMPTY = -1 #mailbox value for a square with no piece on it
+
+PIECE_NAMES = ("wP", "wN", "wB", "wR", "wQ", "wK", "bP", "bN", "bB", "bR", "bQ", "bK") #maps piece indexes to the strings used by the GUI
+PIECE_INDEXES = {name:index for index,name in enumerate(PIECE_NAMES)} #maps the GUI's piece strings to piece indexes
+
+WK_CASTLING, WQ_CASTLING, BK_CASTLING, BQ_CASTLING = 1, 2, 4, 8 #castling right flags, stored together in a single integer
+ALL_CASTLING = WK_CASTLING | WQ_CASTLING | BK_CASTLING | BQ_CASTLING
+
+SQUARES = tuple((7 - square//8, square%8) for square in range(64)) #maps square indexes to (row, col) board indexes
+BB_SQUARES = tuple(1 << square for square in range(64)) #single bit mask for each square
+BB_ALL = (1 << 64) - 1 #every square on the board
+
+#Castling rights which remain after a move to/from each square (moving the king or a rook, or capturing a rook, removes them)
+CASTLING_MASKS = [ALL_CASTLING] * 64
+CASTLING_MASKS[0] = ALL_CASTLING & ~WQ_CASTLING #a1 rook
+CASTLING_MASKS[7] = ALL_CASTLING & ~WK_CASTLING #h1 rook
+CASTLING_MASKS[4] = ALL_CASTLING & ~(WK_CASTLING | WQ_CASTLING) #e1 king
+CASTLING_MASKS[56] = ALL_CASTLING & ~BQ_CASTLING #a8 rook
+CASTLING_MASKS[63] = ALL_CASTLING & ~BK_CASTLING #h8 rook
+CASTLING_MASKS[60] = ALL_CASTLING & ~(BK_CASTLING | BQ_CASTLING) #e8 king
+CASTLING_MASKS = tuple(CASTLING_MASKS)
+
+CASTLING_ROOKS = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)} #maps the king's end square when castling to the rook's initial/end square
+
+#Zobrist keys - random 64-bit numbers which are XORed together to give a position's hash
+#A fixed seed is used so the same position has the same hash in every process (e.g. between search workers)
+_zobristRandom = random.Random(20220422)
+ZOBRIST_PIECES = tuple(tuple(_zobristRandom.getrandbits(64) for square in range(64)) for piece in range(12)) #indexed by [piece][square]
+ZOBRIST_BLACK_MOVE = _zobristRandom.getrandbits(64) #included when black is the moving player
+ZOBRIST_CASTLING = tuple(_zobristRandom.getrandbits(64) for castling in range(16)) #one key for each combination of castling rights
+ZOBRIST_EN_PASSANT = tuple(_zobristRandom.getrandbits(64) for file in range(8)) #indexed by the file of the en passant square
+
+STARTING_BOARD = (("bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"),
+                  ("bP", "bP", "bP", "bP", "bP", "bP", "bP", "bP"),
+                  ("", "", "", "", "", "", "", ""),
+                  ("", "", "", "", "", "", "", ""),
+                  ("", "", "", "", "", "", "", ""),
+                  ("", "", "", "", "", "", "", ""),
+                  ("wP", "wP", "wP", "wP", "wP", "wP", "wP", "wP"),
+                  ("wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"))
+
+
+#Converts (row, col) board indexes into a square index
+def toSquare(rowCol):
+    return (7 - rowCol[0])*8 + rowCol[1]
+
+
+#Holds the pieces, side to move, castling rights and en passant square of a position
+class Position:
+
+    def __init__(self, board=STARTING_BOARD, whiteMove=True, castling=ALL_CASTLING, enPassant=None):
+        self.pieces = [0] * 12 #one bitboard for each piece type/colour (indexed by piece index)
+        self.occupied = [0, 0] #bitboards of the squares occupied by each colour (indexed by WHITE/BLACK)
+        self.mailbox = [EMPTY] * 64 #piece index on each square, allows the piece on a square to be found without checking all 12 bitboards
+        self.whiteMove = whiteMove #current moving player (True if white)
+        self.castling = castling #castling rights which are still available (combination of the castling flags)
+        self.enPassant = enPassant #square a pawn can be taken on by en passant (the square skipped by a double pawn move), None if there isn't one
+        self.hash = 0 #Zobrist hash of the position, the piece keys are added by addPiece()
+        for row in range(8): #places each piece from the string board onto the bitboards
+            for col in range(8):
+                if board[row][col] != "":
+                    self.addPiece(PIECE_INDEXES[board[row][col]], toSquare((row, col)))
+        self.hash ^= self.stateHash(whiteMove, castling, enPassant)
+
+    #Places the piece on the given (empty) square
+    def addPiece(self, piece, square):
+        bit = BB_SQUARES[square]
+        self.pieces[piece] |= bit
+        self.occupied[piece // 6] |= bit #piece indexes 0-5 are white, 6-11 are black
+        self.mailbox[square] = piece
+        self.hash ^= ZOBRIST_PIECES[piece][square]
+
+    #Removes the piece from the given square
+    def removePiece(self, piece, square):
+        bit = BB_SQUARES[square]
+        self.pieces[piece] ^= bit
+        self.occupied[piece // 6] ^= bit
+        self.mailbox[square] = EMPTY
+        self.hash ^= ZOBRIST_PIECES[piece][square]
+
+    #The part of the hash which comes from the moving player, castling rights and en passant square (rather than the pieces)
+    @staticmethod
+    def stateHash(whiteMove, castling, enPassant):
+        stateHash = ZOBRIST_CASTLING[castling]
+        if not whiteMove:
+            stateHash ^= ZOBRIST_BLACK_MOVE
+        if enPassant is not None:
+            stateHash ^= ZOBRIST_EN_PASSANT[enPassant % 8]
+        return stateHash
+
+    #Recalculates the hash from scratch (the incrementally updated hash should always be equal to this)
+    def computeHash(self):
+        hash = self.stateHash(self.whiteMove, self.castling, self.enPassant)
+        for square, piece in enumerate(self.mailbox):
+            if piece != EMPTY:
+                hash ^= ZOBRIST_PIECES[piece][square]
+        return hash
+
+    #Returns the piece index on the given square (EMPTY if there isn't one)
+    def pieceAt(self, square):
+        return self.mailbox[square]
+
+    #Returns the square index of the given colour's king
+    def kingSquare(self, colour):
+        return self.pieces[colour*6 + KING].bit_length() - 1
+
+    #Bitboard of all the occupied squares
+    def allOccupied(self):
+        return self.occupied[WHITE] | self.occupied[BLACK]
+
+    #Derives the 8x8 board of piece strings used by the GUI (e.g. "wP", "" for empty squares)
+    def toBoard(self):
+        return [[PIECE_NAMES[self.mailbox[(7-row)*8 + col]] if self.mailbox[(7-row)*8 + col] != EMPTY else "" for col in range(8)] for row in range(8)]
+
+    #Returns an independent copy of the position
+    def copy(self):
+        position = Position.__new__(Position) #skips __init__, since the pieces are copied directly
+        position.pieces = list(self.pieces)
+        position.occupied = list(self.occupied)
+        position.mailbox = list(self.mailbox)
+        position.whiteMove = self.whiteMove
+        position.castling = self.castling
+        position.enPassant = self.enPassant
+        position.hash = self.hash
+        return position
+
+KNIGHT_VECTORS = ((1,2),(2,1),(2,-1),(1,-2),(-1,-2),(-2,-1),(-2,1),(-1,2)) #(rank, file) steps for each piece type
+KING_VECTORS = ((1,0),(1,1),(0,1),(-1,1),(-1,0),(-1,-1),(0,-1),(1,-1))
+PAWN_VECTORS = (((1,-1),(1,1)), ((-1,-1),(-1,1))) #white pawns attack up the board, black pawns attack down it
+
+
+#Bitboard of the squares a single step along each vector reaches from the given square (used to build the attack tables)
+def stepAttacks(square, vectors):
+    rank, file = divmod(square, 8)
+    attacks = 0
+    for v in vectors:
+        endRank, endFile = rank + v[0], file + v[1]
+        if 0<=endRank<8 and 0<=endFile<8: #step stays on the board
+            attacks |= BB_SQUARES[endRank*8 + endFile]
+    return attacks
+
+
+#Bitboard of every square from the given square to the edge of the board along the vector (not including the square itself)
+def rayAttacks(square, vector):
+    rank, file = divmod(square, 8)
+    ray = 0
+    rank, file = rank + vector[0], file + vector[1]
+    while 0<=rank<8 and 0<=file<8:
+        ray |= BB_SQUARES[rank*8 + file]
+        rank, file = rank + vector[0], file + vector[1]
+    return ray
+
+
+#Precomputed attack tables, indexed by square
+KNIGHT_ATTACKS = tuple(stepAttacks(square, KNIGHT_VECTORS) for square in range(64))
+KING_ATTACKS = tuple(stepAttacks(square, KING_VECTORS) for square in range(64))
+PAWN_ATTACKS = tuple(tuple(stepAttacks(square, vectors) for square in range(64)) for vectors in PAWN_VECTORS) #indexed by [colour][square]
+
+#Ray tables for the sliding pieces, paired with whether the ray runs towards higher square indexes
+#(the nearest blocker on a ray is then its lowest set bit, otherwise its highest set bit)
+RAYS = {vector: tuple(rayAttacks(square, vector) for square in range(64)) for vector in KING_VECTORS}
+ROOK_RAYS = tuple((RAYS[v], v[0]*8 + v[1] > 0) for v in ((1,0),(0,1),(-1,0),(0,-1)))
+BISHOP_RAYS = tuple((RAYS[v], v[0]*8 + v[1] > 0) for v in ((1,1),(1,-1),(-1,1),(-1,-1)))
+
+#Squares strictly between two squares on the same rank, file or diagonal (0 if they aren't aligned), indexed by [square1][square2]
+BETWEEN = [[0] * 64 for square in range(64)]
+for vector in KING_VECTORS:
+    for square1 in range(64):
+        ray = RAYS[vector][square1]
+        while ray:
+            bit = ray & -ray
+            square2 = bit.bit_length() - 1
+            BETWEEN[square1][square2] = RAYS[vector][square1] & RAYS[(-vector[0], -vector[1])][square2] #squares on both rays lie between the two squares
+            ray ^= bit
+BETWEEN = tuple(tuple(row) for row in BETWEEN)
+
+
+#Bitboard of the squares a sliding piece on the given square attacks along the given rays (each ray stops at, and includes, the first occupied square)
+def slidingAttacks(square, occupied, rays):
+    attacks = 0
+    for rayTable, positive in rays:
+        ray = rayTable[square]
+        blockers = ray & occupied
+        if blockers:
+            blocker = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1 #nearest piece along the ray
+            ray ^= rayTable[blocker] #removes the squares behind the blocking piece
+        attacks |= ray
+    return attacks
+
+
+def rookAttacks(square, occupied):
+    return slidingAttacks(square, occupied, ROOK_RAYS)
+
+
+def bishopAttacks(square, occupied):
+    return slidingAttacks(square, occupied, BISHOP_RAYS)
+
+
+#Bitboard of the given colour's pieces which attack the square (with 'occupied' as the pieces on the board)
+def attackersTo(position, square, byColour, occupied):
+    pieces = position.pieces
+    offset = byColour*6 #black pieces are offset by 6
+    attackers = (KNIGHT_ATTACKS[square] & pieces[offset+KNIGHT]
+                 | KING_ATTACKS[square] & pieces[offset+KING]
+                 | PAWN_ATTACKS[1-byColour][square] & pieces[offset+PAWN] #a pawn attacks the square if a pawn of the other colour on the square would attack it
+                 | rookAttacks(square, occupied) & (pieces[offset+ROOK] | pieces[offset+QUEEN])
+                 | bishopAttacks(square, occupied) & (pieces[offset+BISHOP] | pieces[offset+QUEEN]))
+    return attackers & occupied #pieces removed from 'occupied' (e.g. just taken) can't attack
+
+
+#Whether any of the given colour's pieces attack the square, cheaper than attackersTo() since it stops at the first attacker found
+def isAttacked(position, square, byColour, occupied):
+    pieces = position.pieces
+    offset = byColour*6
+    if (KNIGHT_ATTACKS[square] & pieces[offset+KNIGHT] | PAWN_ATTACKS[1-byColour][square] & pieces[offset+PAWN] | KING_ATTACKS[square] & pieces[offset+KING]) & occupied:
+        return True
+    queens = pieces[offset+QUEEN]
+    if bishopAttacks(square, occupied) & (pieces[offset+BISHOP] | queens) & occupied:
+        return True
+    return bool(rookAttacks(square, occupied) & (pieces[offset+ROOK] | queens) & occupied)
+
+
+#Maps each of the given colour's pinned pieces to the squares it can still move to (the ray between its king and the pinning piece)
+def pinnedPieces(position, colour):
+    pieces = position.pieces
+    kingSquare = position.kingSquare(colour)
+    occupied = position.allOccupied()
+    offset = (1-colour)*6 #opponent's pieces
+    pins = {}
+    snipers = (rookAttacks(kingSquare, 0) & (pieces[offset+ROOK] | pieces[offset+QUEEN])
+               | bishopAttacks(kingSquare, 0) & (pieces[offset+BISHOP] | pieces[offset+QUEEN])) #sliders which would attack the king on an empty board
+    while snipers:
+        bit = snipers & -snipers
+        ray = BETWEEN[kingSquare][bit.bit_length() - 1]
+        blockers = ray & occupied
+        if blockers and not blockers & (blockers - 1) and blockers & position.occupied[colour]: #exactly one piece in the way, and it's a friendly piece
+            pins[blockers.bit_length() - 1] = ray | bit
+        snipers ^= bit
+    return pins
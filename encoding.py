@@ -0,0 +1,44 @@
+#Board encodings shared by training (parseGames.py, train.py) and play (main.py), so positions are always encoded the same way
+import numpy as np
+
+#Boards are stored as 64 square values (a1=0, b1=1, ..., h8=63): 0 for an empty square, 1-6 for white's pawn, knight, bishop, rook, queen and king,
+#and 8-13 for black's (the piece type + 7)
+PIECE_CODES = np.array([1, 2, 3, 4, 5, 6, 8, 9, 10, 11, 12, 13], dtype=np.int8) #square value of each piece index (see bitboard.PIECE_NAMES)
+MAILBOX_CODES = np.append(PIECE_CODES, np.int8(0)) #same, but indexed by a mailbox entry - an empty square (-1) picks the final 0
+PLANE_VALUE = 10 #value set in a piece's plane on the squares it occupies (0 everywhere else)
+
+
+#Converts a python-chess board into its 64 square values
+def squaresFromBoard(board):
+    masks = np.array([board.pieces_mask(pieceType, colour) for colour in (True, False) for pieceType in range(1, 7)], dtype="<u8") #square mask of each piece (white first)
+    bits = np.unpackbits(masks.view(np.uint8).reshape(12, 8), axis=1, bitorder="little") #shape (12, 64), bit set for each square the piece occupies
+    return (PIECE_CODES @ bits).astype(np.int8)
+
+
+#Converts a bitboard.Position (or anything with its mailbox, e.g. a GameState's position) into its 64 square values
+def squaresFromPosition(position):
+    return MAILBOX_CODES[position.mailbox]
+
+
+#Returns the 64 square values for a python-chess board, GameState or Position - arrays of square values (one board, or a batch) are returned as int8 arrays
+def encodeSquares(board):
+    if hasattr(board, "pieces_mask"): #python-chess board
+        return squaresFromBoard(board)
+    if hasattr(board, "position"): #GameState
+        board = board.position
+    if hasattr(board, "mailbox"):
+        return squaresFromPosition(board)
+    return np.asarray(board, dtype=np.int8)
+
+
+#Encodes square values as the network's input - one 64 square plane for each piece (in PIECE_CODES order), concatenated into 768 values per board
+#Works on a single board (shape (64,)) or a batch (shape (boards, 64))
+def encodePlanes(squares, dtype=np.float32):
+    squares = np.asarray(squares)
+    planes = squares[..., None, :] == PIECE_CODES[:, None] #shape (..., 12, 64), True on the squares each piece occupies
+    return (planes * np.array(PLANE_VALUE, dtype=dtype)).reshape(squares.shape[:-1] + (768,))
+
+
+#Encodes a python-chess board, GameState, Position or array of square values as the network's input
+def encode(board):
+    return encodePlanes(encodeSquares(board))
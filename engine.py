@@ -0,0 +1,863 @@
+#The chess engine itself - the game's rules (GameState) and the AI (ChessAI), with no pygame or TensorFlow imports, so it can be used without a window
+#(main.py is the pygame GUI on top of it)
+import os
+import numpy as np
+import random
+import time
+import multiprocessing
+import threading
+from inference import NumpyModel
+from weights import loadVariables
+from encoding import encodeSquares
+from transposition import TranspositionTable, EvalCache, EXACT, LOWER_BOUND, UPPER_BOUND
+from bitboard import (Position, toSquare, attackersTo, isAttacked, pinnedPieces, rookAttacks, bishopAttacks,
+                      KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, SQUARES, BB_SQUARES, BB_ALL, CASTLING_MASKS, CASTLING_ROOKS,
+                      PIECE_NAMES, EMPTY, PAWN, ROOK, QUEEN, KING, WK_CASTLING, WQ_CASTLING, BK_CASTLING, BQ_CASTLING, ZOBRIST_BLACK_MOVE)
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+CASTLING_FLAGS = {"K": WK_CASTLING, "Q": WQ_CASTLING, "k": BK_CASTLING, "q": BQ_CASTLING} #maps FEN castling letters to the castling flags
+CASTLING_HOME_PIECES = {4: "wK", 0: "wR", 7: "wR", 60: "bK", 56: "bR", 63: "bR"} #piece each castling square must hold for the castling rights involving it
+
+ranksToRows = {"1": 7, "2":6, "3": 5, "4":4,  #converts chess notation
+               "5":3, "6": 2, "7": 1, "8": 0} #to board indexes 
+filesToCols = {"a": 0, "b": 1, "c": 2, "d": 3,
+               "e": 4, "f": 5, "g": 6, "h": 7}
+rowsToRanks = {val:key for key,val in ranksToRows.items()} #converts board indexes
+colsToFiles = {val:key for key,val in filesToCols.items()} #to chess notation
+
+pieceValues = {"P":1, "B":3, "N":3, "R":5, "Q":9} #used to find points gained when taking a piece (king is never 'captured') 
+MATE_SCORE = 1e9 #evaluation given to a checkmate (positive if white wins), larger than any network evaluation
+MAX_DEPTH = 32 #deepest iteration the AI's iterative deepening will search to
+indexValues = [pieceValues.get(name[1], 0) for name in PIECE_NAMES] + [0] #pieceValues by piece index (the final 0 is picked by an empty square's index, -1)
+attackerValues = [pieceValues.get(name[1], pieceValues["Q"] + 1) for name in PIECE_NAMES] #capturing piece's value in MVV-LVA, where the king is the most valuable attacker
+#move ordering scores: the hash move is searched first, then captures/promotions, then the killer moves, then the other moves by their history score
+HASH_MOVE_ORDER = 1e9
+CAPTURE_ORDER = 1e6
+KILLER_ORDER = 9e5
+HISTORY_MAX = 5e5 #history scores are halved once one reaches this, so they stay below the killer moves' score
+#saves of the trained model, found next to this file (so the engine can be run from any directory)
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model1.bin")
+TEXT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model1.txt")
+
+
+#Implements all functionality for the the chess game itself
+class GameState:
+
+    def __init__(self):
+        self.position = Position() #bitboards for each piece, plus the moving player, castling rights and en passant square (initialised to the starting position)
+        self.moveFuncs = (self.getPawnMoves, self.getKnightMoves, self.getBishopMoves,
+                          self.getRookMoves, self.getQueenMoves, self.getKingMoves)  #maps piece types (PAWN...KING) directly to their move functions
+
+        self.moveTracker = [] #list of moves made so far
+        self.Checkmate = False #whether the game has reached checkmate (True if so)
+        self.Stalemate = False  #whether the game has reached stalemate (True if so)
+        self.legalMoves = [] #legal moves last fetched for the human player
+        self.movesDict = {} #maps selected squares to the end squares of their legal moves, used in highlighting possible moves (in drawBoard())
+
+    #Creates a game from a FEN string (the halfmove and fullmove counters are ignored, since they aren't tracked)
+    @classmethod
+    def fromFen(cls, fen):
+        fields = fen.split()
+        if len(fields) < 4 or fields[1] not in ("w", "b"):
+            raise ValueError("invalid FEN: " + fen)
+        board = []
+        for rank in fields[0].split("/"): #ranks are listed from the 8th down, the same order as the board's rows
+            row = []
+            for char in rank:
+                if char.isdigit(): #run of empty squares
+                    row += [""] * int(char)
+                else:
+                    row.append(("w" if char.isupper() else "b") + char.upper())
+            board.append(row)
+        if len(board) != 8 or any(len(row) != 8 for row in board) or any(piece not in PIECE_NAMES for row in board for piece in row if piece):
+            raise ValueError("invalid FEN board: " + fields[0])
+        castling = 0
+        for char in fields[2].replace("-", ""):
+            castling |= CASTLING_FLAGS[char]
+        for square, piece in CASTLING_HOME_PIECES.items(): #drops rights the FEN gives without the king or rook on its home square (castling would move a missing piece)
+            row, col = SQUARES[square]
+            if board[row][col] != piece:
+                castling &= CASTLING_MASKS[square]
+        enPassant = toSquare((ranksToRows[fields[3][1]], filesToCols[fields[3][0]])) if fields[3] != "-" else None
+        gameState = cls()
+        gameState.position = Position(board, fields[1] == "w", castling, enPassant)
+        return gameState
+
+    #Returns an independent copy of the game (e.g. for the AI to search, without changing the board being drawn)
+    def copy(self):
+        gameState = GameState()
+        gameState.position = self.position.copy()
+        gameState.moveTracker = list(self.moveTracker)
+        gameState.Checkmate, gameState.Stalemate = self.Checkmate, self.Stalemate
+        return gameState
+
+    #Pickling support (used to send positions to the search worker processes) - the bound move functions are rebuilt rather than pickled, and functions set on the
+    #instance (e.g. bench.py's profiling wrappers) are left out, so the workers use the class's own methods
+    def __getstate__(self):
+        return {name: value for name, value in self.__dict__.items() if name != "moveFuncs" and not callable(value)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.moveFuncs = (self.getPawnMoves, self.getKnightMoves, self.getBishopMoves,
+                          self.getRookMoves, self.getQueenMoves, self.getKingMoves)
+
+    #The board as an 8x8 array of piece strings (e.g. "wP"), derived from the bitboards - only used for drawing the pieces
+    @property
+    def board(self):
+        return self.position.toBoard()
+
+    #Current moving player (True if white)
+    @property
+    def whiteMove(self):
+        return self.position.whiteMove
+
+    @whiteMove.setter
+    def whiteMove(self, whiteMove):
+        if whiteMove != self.position.whiteMove: #keeps the hash in line with the moving player
+            self.position.hash ^= ZOBRIST_BLACK_MOVE
+        self.position.whiteMove = whiteMove
+
+    #64-bit Zobrist hash of the current position (pieces, moving player, castling rights and en passant file), updated as moves are made/reversed
+    @property
+    def hash(self):
+        return self.position.hash
+
+    #(row, col) of the white king
+    @property
+    def wKPosition(self):
+        return SQUARES[self.position.kingSquare(0)] #colour index 0 is white
+
+    #(row, col) of the black king
+    @property
+    def bKPosition(self):
+        return SQUARES[self.position.kingSquare(1)] #colour index 1 is black
+
+    #Returns the piece string (e.g. "wP") on the given (row, col) square, or "" if it's empty
+    def pieceAt(self, square):
+        piece = self.position.mailbox[toSquare(square)]
+        return PIECE_NAMES[piece] if piece != EMPTY else ""
+
+    #Handles updating the board as moves are made
+    def movePiece(self, initSquare, endSquare): #takes move's initial and end square
+        position = self.position
+        initIndex, endIndex = toSquare(initSquare), toSquare(endSquare) #square indexes of the move
+        pieceMoved = position.mailbox[initIndex] #accesses piece which is being moved
+        endPiece = position.mailbox[endIndex] #accesses piece at square which piece is moving to
+        previousCastling, previousEnPassant = position.castling, position.enPassant #caches the castling rights and en passant square in case move is reversed
+        castlingMove = False #used in revMove() to know when to reverse the rook move as well (set to True if it is)
+        enPasMove = False #used in revMove() to know when to reverse en passant moves (set to True if it is)
+
+        if endPiece != EMPTY: #removes the taken piece from the board
+            position.removePiece(endPiece, endIndex)
+        position.removePiece(pieceMoved, initIndex)
+        if pieceMoved == PAWN and endIndex >= 56: #Handles pawn promotion (automatic queen)
+            position.addPiece(QUEEN, endIndex)
+        elif pieceMoved == 6+PAWN and endIndex < 8:
+            position.addPiece(6+QUEEN, endIndex)
+        else:
+            position.addPiece(pieceMoved, endIndex) #reflects the move on the board (moves the piece)
+
+        if pieceMoved % 6 == KING and abs(endIndex - initIndex) == 2: #castling move, so the rook is moved as well
+            rookFrom, rookTo = CASTLING_ROOKS[endIndex]
+            position.removePiece(pieceMoved - KING + ROOK, rookFrom)
+            position.addPiece(pieceMoved - KING + ROOK, rookTo)
+            castlingMove = True
+        elif pieceMoved % 6 == PAWN and endIndex == previousEnPassant: #move is an en passant move
+            takenSquare = endIndex - 8 if pieceMoved == PAWN else endIndex + 8 #the taken pawn is behind the end square
+            position.removePiece(6+PAWN if pieceMoved == PAWN else PAWN, takenSquare) #removes the taken pawn from board
+            enPasMove = True #indicates to revMove() that it needs to reverse an en passant move
+
+        if pieceMoved % 6 == PAWN and abs(endIndex - initIndex) == 16: #pawn double move
+            position.enPassant = (initIndex + endIndex) // 2 #the square the pawn skipped over can be taken on by en passant
+        else:
+            position.enPassant = None
+        position.castling &= CASTLING_MASKS[initIndex] & CASTLING_MASKS[endIndex] #moving the king/rooks (or taking a rook) disables castling on that side
+        #the pieces' hash keys were updated as they were moved, the rest of the hash is swapped for the new state
+        position.hash ^= Position.stateHash(position.whiteMove, previousCastling, previousEnPassant) ^ Position.stateHash(not position.whiteMove, position.castling, position.enPassant)
+        #passes all the information needed to display or reverse moves
+        self.moveTracker.append((initSquare, endSquare, pieceMoved, endPiece, castlingMove, enPasMove, previousCastling, previousEnPassant))
+        position.whiteMove = not position.whiteMove #move has been made so switch moving player
+
+
+    #Used to reverse moves when checking legality
+    def revMove(self):
+        initSquare, endSquare, pieceMoved, endPiece, castlingMove, enPasMove, previousCastling, previousEnPassant = self.moveTracker.pop() #most recent move stored on top of move tracker list
+        position = self.position
+        initIndex, endIndex = toSquare(initSquare), toSquare(endSquare)
+        position.removePiece(position.mailbox[endIndex], endIndex) #removes the moved piece (which may have been promoted) from its end square
+        position.addPiece(pieceMoved, initIndex) #re-places the moved piece on its initial square
+        if endPiece != EMPTY: #re-places the taken piece
+            position.addPiece(endPiece, endIndex)
+        if castlingMove: #reverses the rook move as well
+            rookFrom, rookTo = CASTLING_ROOKS[endIndex]
+            position.removePiece(pieceMoved - KING + ROOK, rookTo)
+            position.addPiece(pieceMoved - KING + ROOK, rookFrom)
+        elif enPasMove: #re-places the pawn taken by en passant
+            if pieceMoved == PAWN:
+                position.addPiece(6+PAWN, endIndex - 8)
+            else:
+                position.addPiece(PAWN, endIndex + 8)
+        position.hash ^= Position.stateHash(position.whiteMove, position.castling, position.enPassant) ^ Position.stateHash(not position.whiteMove, previousCastling, previousEnPassant) #swaps the state part of the hash back
+        position.castling, position.enPassant = previousCastling, previousEnPassant #reverts castling rights and en passant square to cached ones (from before move was made)
+        position.whiteMove = not position.whiteMove #move reversed so reverse moving player
+
+    #Parses all the moves moving player could make without check limitations
+    def getAllMoves(self):
+        moves = [] #the possible moves
+        position = self.position
+        own = position.occupied[0 if self.whiteMove else 1] #bitboard of the moving player's pieces (colour index 0 is white, 1 is black)
+        occupied = position.allOccupied()
+        pieces = own
+        #iterates through each of the moving player's pieces
+        while pieces:
+            bit = pieces & -pieces #lowest set bit (the next piece)
+            square = bit.bit_length() - 1
+            self.moveFuncs[position.mailbox[square] % 6](square, own, occupied, moves) #calls the relevant move function (updating the move list)
+            pieces ^= bit #removes the piece from the remaining pieces
+        return moves #returns the list of parsed moves
+
+    #Updates the list of possible moves by taking legality into account
+    #Checks and pins are found once for the position, so each pseudo-legal move is validated without making it on the board
+    def getLegalMoves(self, aiMove=False): #aiMove set to True when called by ChessAI.minMax(), so the moves aren't kept for move highlighting
+        position = self.position
+        colour = 0 if self.whiteMove else 1 #colour index of the moving player (0 is white, 1 is black)
+        kingSquare = position.kingSquare(colour)
+        kingBit = BB_SQUARES[kingSquare]
+        occupied = position.allOccupied() #bitboard of all the pieces on the board
+        checkers = attackersTo(position, kingSquare, 1-colour, occupied) #opponent pieces giving check
+        if not checkers: #not in check, so pieces can move to any square
+            checkMask = BB_ALL
+        elif not checkers & (checkers - 1): #single check, so the checking piece must be taken or blocked
+            checkMask = checkers | BETWEEN[kingSquare][checkers.bit_length() - 1]
+        else: #double check, so only the king can move
+            checkMask = 0
+        pins = pinnedPieces(position, colour) #maps pinned pieces to the squares they can still move to
+
+        legalMoves = []
+        for move in self.getAllMoves(): #pseudo-legal moves (castlingCheck() has already validated castling)
+            initIndex, endIndex = toSquare(move[0]), toSquare(move[1])
+            endBit = BB_SQUARES[endIndex]
+            if initIndex == kingSquare: #king move, the end square can't be attacked once the king has left its current square
+                legal = abs(endIndex - initIndex) == 2 or not isAttacked(position, endIndex, 1-colour, occupied ^ kingBit)
+            elif endIndex == position.enPassant and position.mailbox[initIndex] % 6 == PAWN: #en passant removes two pieces from the same rank, so the resulting position is checked directly
+                takenBit = BB_SQUARES[endIndex - 8 if colour == 0 else endIndex + 8]
+                legal = not isAttacked(position, kingSquare, 1-colour, occupied ^ BB_SQUARES[initIndex] ^ takenBit | endBit)
+            else: #must block/take the checking piece, and pinned pieces can only move along their pin
+                legal = endBit & checkMask and (initIndex not in pins or endBit & pins[initIndex])
+            if legal:
+                legalMoves.append(move)
+        #Checkmate/Stalemate reflect the position this was last called on
+        self.Checkmate = not legalMoves and bool(checkers) #no legal moves and player is in check, it's checkmate
+        self.Stalemate = not legalMoves and not checkers #no legal moves but the player isn't in check, it's a stalemate
+        if not aiMove: #keeps the human player's moves so the selected piece's moves can be highlighted
+            self.legalMoves = legalMoves
+            self.movesDict.clear()
+        return legalMoves #returns the list of legal moves
+
+    #Returns the end squares of the legal moves from the given (row, col) square, for use in move highlighting (in drawBoard())
+    #Only built for squares which are actually selected, so move generation doesn't have to track them
+    def getPieceMoves(self, square):
+        if square not in self.movesDict:
+            self.movesDict[square] = [move[1] for move in self.legalMoves if move[0] == square]
+        return self.movesDict[square]
+
+    #Determines if the given (row, col) square is attacked by any of the given colour's pieces ("w" or "b")
+    def isSquareAttacked(self, square, byColour):
+        return isAttacked(self.position, toSquare(square), 0 if byColour == "w" else 1, self.position.allOccupied())
+
+    #Determines if the moving player's king is in check
+    def kingInCheck(self):
+        if self.whiteMove: #white is moving
+            return self.isSquareAttacked(self.wKPosition, "b") #returns whether current wking possion is under attack
+        else: #black is moving
+            return self.isSquareAttacked(self.bKPosition, "w") #returns whther current bking position is under attack
+
+    #Determines if castling is possible for moving player
+    def castlingCheck(self, moves):
+        position = self.position
+        occupied = position.allOccupied() #bitboard of all the pieces on the board
+        colour = 0 if self.whiteMove else 1 #colour index of the moving player
+        #the castling right, squares which must be empty, squares the king passes through (which can't be attacked) and the king move for each side
+        if self.whiteMove:
+            sides = ((WQ_CASTLING, BB_SQUARES[1] | BB_SQUARES[2] | BB_SQUARES[3], (4, 3, 2), ((7,4),(7,2))),
+                     (WK_CASTLING, BB_SQUARES[5] | BB_SQUARES[6], (4, 5, 6), ((7,4),(7,6))))
+        else:
+            sides = ((BQ_CASTLING, BB_SQUARES[57] | BB_SQUARES[58] | BB_SQUARES[59], (60, 59, 58), ((0,4),(0,2))),
+                     (BK_CASTLING, BB_SQUARES[61] | BB_SQUARES[62], (60, 61, 62), ((0,4),(0,6))))
+        for right, path, kingPath, move in sides:
+            if position.castling & right and not occupied & path: #castling still possible and no pieces are blocking path
+                if not any(isAttacked(position, square, 1-colour, occupied) for square in kingPath): #king isn't in check, and doesn't pass through or land on an attacked square
+                    moves.append(move) #add move for king
+
+    #Adds a move from the given square to each square in the 'targets' bitboard
+    def addMoves(self, square, targets, moves):
+        initSquare = SQUARES[square] #(row, col) of the piece
+        while targets:
+            bit = targets & -targets #lowest set bit (the next end square)
+            moves.append((initSquare, SQUARES[bit.bit_length() - 1])) #move is possible so add it to move list
+            targets ^= bit
+
+    #Each move function takes the piece's square index, the moving player's pieces, all the pieces on the board and the move list to update
+
+    #Determines the possible moves for a given rook
+    def getRookMoves(self, square, own, occupied, moves):
+        self.addMoves(square, rookAttacks(square, occupied) & ~own, moves) #rook moves along rows and columns until blocked, and can't take friendly pieces
+
+    #Determines the possible moves for a given knight
+    def getKnightMoves(self, square, own, occupied, moves):
+        self.addMoves(square, KNIGHT_ATTACKS[square] & ~own, moves) #knight squares which aren't friendly pieces
+
+    #Determines the possible moves for a given bishop
+    def getBishopMoves(self, square, own, occupied, moves):
+        self.addMoves(square, bishopAttacks(square, occupied) & ~own, moves) #bishop moves along diagonals until blocked, and can't take friendly pieces
+
+    #Determines the possible moves a given queen can make
+    def getQueenMoves(self, square, own, occupied, moves):
+        self.addMoves(square, (rookAttacks(square, occupied) | bishopAttacks(square, occupied)) & ~own, moves) #combines rook and bishop movement
+
+    #Determines the possible moves a given king can make
+    def getKingMoves(self, square, own, occupied, moves):
+        self.addMoves(square, KING_ATTACKS[square] & ~own, moves) #adjacent squares which aren't friendly pieces
+        self.castlingCheck(moves) #checks if castling possible, updates move list if so
+
+    #Determines the possible moves for a given pawn
+    def getPawnMoves(self, square, own, occupied, moves):
+        enPassant = self.position.enPassant
+        #white pawns move up the board (to higher square indexes) and black pawns move down it
+        if self.whiteMove:
+            step, startRank, colour = 8, 1, 0
+            enPassantBit = BB_SQUARES[enPassant] if enPassant is not None and enPassant >= 40 else 0 #white can only take by en passant on the 6th rank
+        else:
+            step, startRank, colour = -8, 6, 1
+            enPassantBit = BB_SQUARES[enPassant] if enPassant is not None and enPassant < 24 else 0 #black can only take by en passant on the 3rd rank
+        targets = PAWN_ATTACKS[colour][square] & (occupied & ~own | enPassantBit) #diagonal squares with an enemy piece, or which can be taken on by en passant
+        if not occupied & BB_SQUARES[square + step]: #square in front is empty (pawns never stand on the last rank, since they're promoted)
+            targets |= BB_SQUARES[square + step]
+            if square // 8 == startRank and not occupied & BB_SQUARES[square + 2*step]: #double advance
+                targets |= BB_SQUARES[square + 2*step]
+        self.addMoves(square, targets, moves)
+
+#Raised inside ChessAI.minMax when the time budget or node limit for the current move runs out, unwinding the unfinished iteration
+class SearchTimeout(Exception):
+    pass
+
+
+#Handles making the AI's moves
+class ChessAI():
+    #depth is the deepest iteration searched, moveTime the time budget for each move (in seconds) and nodeLimit the maximum number of nodes searched for each move
+    #(None for no limit) - useNumpy set to False to evaluate with the TensorFlow model instead
+    #randomOrdering set to False to always order moves with equal scores the same way (so the same move is always made in the same position)
+    #hashSizeMB and evalCacheMB are the memory (in MB) used by the transposition table and by the cache of the network's evaluations
+    #workers is the number of processes the root moves are split between (None or 1 searches in this process only)
+    #ponder set to True to keep searching on the opponent's time (see startPondering)
+    #quiescence set to False to evaluate the leaves directly, rather than searching their captures - deltaMargin is how much a pawn is worth in the network's
+    #evaluation units, used to skip captures which can't raise the evaluation enough to matter (None disables this, since the network isn't trained in pawns)
+    def __init__(self, gameState, depth=MAX_DEPTH, hashSizeMB=16, evalCacheMB=16, useNumpy=True, moveTime=1.0, nodeLimit=None, randomOrdering=True, quiescence=True, deltaMargin=None, workers=None, ponder=False):
+        self.useNumpy = useNumpy
+        self.game = gameState #GameState object of the game being played
+        self.gameState = gameState #GameState object being searched (a copy of the game while searching in the background)
+        self.depth = depth #number of moves (plies) searched ahead at most
+        self.moveTime = moveTime
+        self.nodeLimit = nodeLimit
+        self.transpositionTable = TranspositionTable(hashSizeMB) #results of previous searches, keyed by the position's hash
+        self.nodes = 0 #number of positions searched for the current move
+        self.cutoffs = 0 #number of positions in the current search (excluding the quiescence search) where the rest of the moves were pruned
+        self.firstMoveCutoffs = 0 #number of those cutoffs caused by the first move searched, shows how well the moves are ordered
+        self.deadline = None #time (perf_counter) the current search has to stop by
+        self.bestMove = None #best move from the last completed iteration
+        self.bestEval = None #evaluation of the best move from the last completed iteration
+        self.completedDepth = 0 #depth of the last completed iteration
+        self.randomOrdering = randomOrdering
+        self.useQuiescence = quiescence
+        self.deltaMargin = deltaMargin
+        self.evalCache = EvalCache(evalCacheMB) #the network's evaluations of positions, keyed by their hash, so positions reached again aren't re-evaluated
+        self.workers = workers or 1
+        self.searchThread = None #background thread searching for the AI's move (see startSearch)
+        self.searchResult = None #move found by the last background search
+        self.searchStart = None #time (perf_counter) the current search started
+        self.ponder = ponder
+        self.pondering = False #whether the background search is pondering
+        self.ponderHash = None #hash of the position being pondered
+        self.stopEvent = multiprocessing.Event() if self.workers > 1 else threading.Event() #set to cancel the background search (shared with the search workers)
+        self.pool = None #pool of search worker processes, started by the first parallel search
+        self.workerNodes = multiprocessing.Value("q", 0) if self.workers > 1 else None #nodes searched by the workers in the current parallel search (shared with them)
+        self.sharedNodes = None #in a search worker, the main process's workerNodes - so the workers stop together once they've used up the node limit
+        self.flushedNodes = 0 #in a search worker, the nodes of the current task already added to sharedNodes
+        #number of the current parallel search (shared with the workers) - it's changed once the search is over, so tasks still queued from it stop straight away
+        #rather than taking the workers away from the next search
+        self.searchId = multiprocessing.Value("q", 0, lock=False) if self.workers > 1 else None
+        self.taskId = None #in a search worker, the number of the parallel search the current task belongs to
+        #settings each worker's own ChessAI is created with
+        self.workerSettings = {"hashSizeMB": hashSizeMB, "evalCacheMB": evalCacheMB, "useNumpy": useNumpy, "randomOrdering": randomOrdering, "quiescence": quiescence, "deltaMargin": deltaMargin}
+        self.rootMoves = 0 #number of moves made in the game when the current search started, used to find the ply of each node
+        self.killers = {} #maps each ply to the last two quiet moves which caused a cutoff there
+        self.history = [[0] * 64 for square in range(64)] #score for each quiet move (indexed by initial then end square), increased whenever it causes a cutoff
+        self.loadTrainedModel() #instantiates the neural network with the optimized parameters
+
+    #Handles making the AI's decided move  
+    def play(self):
+        return self.makeMove(self.search()) #uses iterative deepening to decide on the move
+
+    #Makes the move decided on by the AI
+    def makeMove(self, move):
+        endPiece = self.gameState.pieceAt(move[1]) #piece present on the end square, used to update scores
+        self.gameState.movePiece(move[0], move[1]) #makes the move (which also switches the moving player back to white)
+        return endPiece, move[0], move[1] #returns piece taken (used for score updates), and the start and end square (for highlighting)
+
+    #Starts searching for the AI's move in a background thread, so the game loop isn't blocked - the move is collected with pollSearch()
+    #If the AI was pondering the position the opponent has just reached, that search carries on as the search for the move instead
+    def startSearch(self):
+        if self.pondering:
+            self.pondering = False
+            if self.searchThread is not None and self.ponderHash == self.game.hash: #opponent made the predicted move (ponder hit)
+                if self.moveTime is not None:
+                    self.deadline = self.searchStart + self.moveTime #time spent pondering counts towards the time budget
+                return
+        self.startThread(self.game.copy())
+
+    #Starts pondering (searching on the opponent's time) once the AI has moved - the opponent's predicted reply (from the last search's principal variation)
+    #is made on a copy of the game, and the AI's answer to it is searched until the opponent moves. If there's no predicted reply, the current position is
+    #searched instead, which still fills the (shared) transposition table for the opponent's replies
+    def startPondering(self):
+        if not self.ponder:
+            return
+        self.cancelSearch()
+        searchState = self.game.copy()
+        predicted = self.principalVariation(1)
+        if predicted:
+            searchState.movePiece(predicted[0][0], predicted[0][1])
+        self.ponderHash = searchState.hash
+        self.startThread(searchState, pondering=True)
+
+    #Starts a search of the given copy of the game in a background thread (the copy is searched, so the game's board can be drawn while it's searched)
+    def startThread(self, searchState, pondering=False):
+        self.cancelSearch()
+        self.stopEvent.clear()
+        self.searchResult = None
+        self.pondering = pondering
+        self.searchThread = threading.Thread(target=self.backgroundSearch, args=(searchState, pondering), daemon=True) #daemon, so it never keeps the program open
+        self.searchThread.start()
+
+    #Runs in the background thread, searching the copy of the game
+    def backgroundSearch(self, searchState, pondering):
+        self.gameState = searchState
+        try:
+            self.searchResult = self.search(pondering)
+        finally:
+            self.gameState = self.game
+
+    #Whether a background search for the AI's move has been started and its move hasn't been collected yet (pondering doesn't count)
+    def isSearching(self):
+        return self.searchThread is not None and not self.pondering
+
+    #Returns the move found by the background search once it has finished (None while it's still searching)
+    def pollSearch(self):
+        if self.searchThread is None or self.searchThread.is_alive() or self.pondering:
+            return None
+        self.searchThread = None
+        return self.searchResult
+
+    #Stops the background search or pondering (e.g. when the window is closed or the game ends), waiting for the thread to finish
+    def cancelSearch(self):
+        if self.searchThread is not None:
+            self.stopEvent.set()
+            self.searchThread.join()
+            self.searchThread = None
+        self.pondering = False
+
+    #Searches the current position to depth 1, 2, 3, ... until the time budget or node limit runs out, returning the best move from the last completed iteration -
+    #each iteration stores its best moves in the transposition table, so the next one searches the previous principal variation first
+    #When pondering there's no time budget, the search runs until it's stopped (or given a deadline by startSearch)
+    def search(self, pondering=False):
+        gameState = self.gameState
+        self.searchStart = time.perf_counter()
+        self.deadline = self.searchStart + self.moveTime if self.moveTime is not None and not pondering else None
+        self.nodes, self.cutoffs, self.firstMoveCutoffs = 0, 0, 0
+        self.bestMove, self.bestEval, self.completedDepth = None, None, 0
+        movesMade = len(gameState.moveTracker) #used to undo the moves of an unfinished iteration
+        self.rootMoves = movesMade
+        self.killers.clear() #killer moves are only useful at the same ply of the same search
+        self.ageHistory()
+        moves = gameState.getLegalMoves(aiMove=True)
+        if not moves: #checkmate or stalemate, there's no move to make
+            return None
+        if len(moves) == 1: #no need to search a forced move
+            self.bestMove = moves[0]
+            return self.bestMove
+        for depth in range(1, self.depth+1):
+            try:
+                if depth > 1 and self.workers > 1: #the first iteration is always searched here, so there's a move to fall back on
+                    move = self.searchParallel(depth, moves)
+                else:
+                    move = self.minMax(depth, gameState.whiteMove, initialCall=True)
+            except SearchTimeout: #iteration didn't finish, so its result is discarded
+                while len(gameState.moveTracker) > movesMade:
+                    gameState.revMove()
+                if self.bestMove is None: #stopped before the first iteration finished, the first move in search order is still better than no move
+                    self.orderMoves(moves, None, 0)
+                    self.bestMove = moves[0]
+                break
+            self.bestMove, self.completedDepth = move, depth
+            if abs(self.bestEval) >= MATE_SCORE: #a forced checkmate has been found, searching deeper won't change the move
+                break
+            #each iteration takes several times longer than the last, so the next one is only started if it has a chance of finishing
+            if self.deadline is not None and time.perf_counter() - self.searchStart > (self.deadline - self.searchStart) / 2:
+                break
+        return self.bestMove
+
+    #Searches the root moves to the given depth, returning the best move - the first move (previous iteration's best) is searched here, then the rest are split
+    #between the worker processes (one task per move, so they're balanced between the workers), with the first move's evaluation as the bound they have to beat
+    #Raises SearchTimeout if any move's search didn't finish
+    def searchParallel(self, depth, moves):
+        gameState = self.gameState
+        maximizingPlayer = gameState.whiteMove #white is the maximizing player
+        self.orderMoves(moves, self.bestMove, 0)
+        bestMove = moves[0]
+        gameState.movePiece(bestMove[0], bestMove[1])
+        bestEval = self.minMax(depth-1, not maximizingPlayer)
+        gameState.revMove()
+        alpha, beta = (bestEval, np.inf) if maximizingPlayer else (-np.inf, bestEval) #the other moves only need exact evaluations if they're better
+        nodeLimit = self.nodeLimit - self.nodes if self.nodeLimit is not None else None
+        tasks = [(gameState, move, depth, alpha, beta, self.deadline, nodeLimit, self.searchId.value) for move in moves[1:]]
+        self.workerNodes.value = 0 #the node limit is shared between all the tasks, rather than each task getting all of it
+        evals = {}
+        results = self.getPool().imap_unordered(searchRootMove, tasks)
+        try:
+            while len(evals) < len(tasks):
+                try:
+                    move, eval, nodes, cutoffs, firstMoveCutoffs = results.next(timeout=0.05) #waits in short steps, so a cancelled search stops straight away
+                except multiprocessing.TimeoutError:
+                    self.checkLimits()
+                    continue
+                self.nodes += nodes
+                self.cutoffs += cutoffs
+                self.firstMoveCutoffs += firstMoveCutoffs
+                evals[move] = eval
+        finally:
+            self.searchId.value += 1 #any of the tasks which haven't finished (e.g. after a timeout) stop at their next check
+        if None in evals.values():
+            raise SearchTimeout
+        for move in moves[1:]: #in search order, so the first of some equally good moves is kept
+            if (evals[move] > bestEval) if maximizingPlayer else (evals[move] < bestEval):
+                bestMove, bestEval = move, evals[move]
+        self.bestEval = bestEval
+        self.transpositionTable.store(gameState.hash, depth, EXACT, bestEval, bestMove)
+        return bestMove
+
+    #Searches a single root move in a worker process, returns (move, evaluation, nodes searched, cutoffs, first move cutoffs) - the evaluation is None if the time budget or node limit ran out (or the parallel search it belongs to is already over)
+    def searchMove(self, gameState, move, depth, alpha, beta, deadline, nodeLimit, searchId):
+        self.gameState = gameState
+        self.taskId = searchId
+        self.deadline, self.nodeLimit, self.nodes = deadline, nodeLimit, 0
+        self.cutoffs, self.firstMoveCutoffs, self.flushedNodes = 0, 0, 0
+        self.bestMove = move #allows checkLimits to stop the search, since the main process always has a move to fall back on
+        self.rootMoves = len(gameState.moveTracker)
+        gameState.movePiece(move[0], move[1])
+        try:
+            eval = self.minMax(depth-1, gameState.whiteMove, alpha, beta)
+        except SearchTimeout:
+            eval = None
+        return move, eval, self.nodes, self.cutoffs, self.firstMoveCutoffs
+
+    #Returns the pool of search worker processes, starting it if it hasn't been already
+    def getPool(self):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers, initializer=initSearchWorker, initargs=(self.workerSettings, self.stopEvent, self.workerNodes, self.searchId))
+        return self.pool
+
+    #Stops the search worker processes (if they were started)
+    def close(self):
+        if self.pool is not None:
+            self.pool.close() #workers exit once they've finished their current task (they aren't terminated, since pygame handles SIGTERM)
+            self.pool.join()
+            self.pool = None
+
+    #Stops the search (by raising SearchTimeout) if the time budget or node limit has run out - an iteration is always completed first, so there's a move to play
+    #(unless the search has been cancelled)
+    def checkLimits(self):
+        if self.stopEvent.is_set():
+            raise SearchTimeout
+        if self.bestMove is None:
+            return
+        if self.taskId is not None and self.searchId.value != self.taskId: #search worker whose parallel search is already over
+            raise SearchTimeout
+        if self.nodeLimit is not None and self.searchedNodes() >= self.nodeLimit:
+            raise SearchTimeout
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
+
+    #Returns the number of nodes counted towards the node limit - in a search worker, the nodes searched by all the workers in the current parallel search
+    def searchedNodes(self):
+        if self.sharedNodes is None:
+            return self.nodes
+        with self.sharedNodes.get_lock():
+            self.sharedNodes.value += self.nodes - self.flushedNodes
+            self.flushedNodes = self.nodes
+            return self.sharedNodes.value
+
+    #Returns the principal variation (the sequence of best moves for both players) from the current position, read from the transposition table
+    def principalVariation(self, maxLength=None):
+        gameState = self.gameState
+        maxLength = maxLength or self.completedDepth
+        moves = []
+        while len(moves) < maxLength:
+            entry = self.transpositionTable.probe(gameState.hash)
+            if not entry or entry[3] not in gameState.getLegalMoves(aiMove=True): #no stored move (or a hash collision)
+                break
+            moves.append(entry[3])
+            gameState.movePiece(entry[3][0], entry[3][1])
+        for move in moves: #reverts back to the current position
+            gameState.revMove()
+        return moves
+        
+    #Estimates the optimum move to make from the given position (white is the maximizing player)
+    def minMax(self, depth, maximizingPlayer=False, alpha=-np.inf, beta=np.inf, initialCall=False):
+        if depth == 0: #leaf node has been reached
+            if self.useQuiescence:
+                return self.quiescence(maximizingPlayer, alpha, beta) #searches the captures from the leaf, so it isn't evaluated in the middle of an exchange
+            self.nodes += 1
+            return self.evaluate() #feeds the board into the trained neural network, outputs a value representing it's 'value'
+        gameState = self.gameState
+        self.nodes += 1
+        self.checkLimits()
+        alphaOriginal, betaOriginal = alpha, beta #the window this node is searched with, used to classify the score which is stored
+        hashMove = None #best move found by a previous search of this position
+        entry = self.transpositionTable.probe(gameState.hash) #previous search of this position (possibly reached through a different move order)
+        if entry:
+            entryDepth, bound, score, hashMove = entry
+            if entryDepth >= depth and not initialCall: #previous search was at least as deep, so its score can be reused
+                if bound == EXACT:
+                    return score
+                elif bound == LOWER_BOUND: #true score is at least 'score'
+                    alpha = max(alpha, score)
+                else: #true score is at most 'score'
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
+        moves = gameState.getLegalMoves(aiMove=True) #gets the legal moves which could be made from the current position
+        if not moves: #end of game in current position
+            if gameState.Checkmate:
+                return -MATE_SCORE if maximizingPlayer else MATE_SCORE #the moving player has lost
+            return self.evaluate() #stalemate
+        ply = len(gameState.moveTracker) - self.rootMoves #number of moves made since the root of the search
+        self.orderMoves(moves, hashMove, ply) #searches the moves most likely to cause a cutoff first, so more of the tree is pruned
+
+        leafEvals = self.evaluateChildren(moves) if depth == 1 else None #all the children are leaves, so they're evaluated together in one batch
+        if leafEvals is not None and not self.useQuiescence:
+            self.nodes += len(moves)
+        bestEval = -np.inf if maximizingPlayer else np.inf #initialises the best evaluation to the worst possible value for the moving player
+        bestMove = moves[0]
+        for child in moves: #iterates through each move which could be made
+            if leafEvals is not None and not self.useQuiescence:
+                eval = leafEvals[child]
+            else:
+                gameState.movePiece(child[0], child[1]) #makes the move
+                if leafEvals is not None: #the leaf's evaluation is used as the quiescence search's stand pat
+                    eval = self.quiescence(not maximizingPlayer, alpha, beta, leafEvals[child])
+                else:
+                    eval = self.minMax(depth-1, not maximizingPlayer, alpha, beta) #evaluates the board in the new position
+                gameState.revMove() #reverts back to the previous board
+            if maximizingPlayer: #white move
+                if eval > bestEval: #tracks the highest evaluation in current branch
+                    bestEval, bestMove = eval, child
+                alpha = max(alpha, eval) #tracks highest evaluation in entire tree
+            else: #black move
+                if eval < bestEval: #tracks the lowest evaluation in current branch
+                    bestEval, bestMove = eval, child
+                beta = min(beta, eval) #tracks lowest evaluation in entire tree
+            if beta <= alpha: #alpha beta pruning
+                self.cutoffs += 1
+                if child is moves[0]:
+                    self.firstMoveCutoffs += 1
+                if not self.moveGain(toSquare(child[0]), toSquare(child[1])): #quiet move, remembered so it's tried early in sibling positions
+                    self.storeCutoff(child, depth, ply)
+                break #prunes the rest of the branch (stops searching it)
+
+        if bestEval <= alphaOriginal: #every move failed low, so the score is only an upper bound
+            bound = UPPER_BOUND
+        elif bestEval >= betaOriginal: #branch was pruned, so the score is only a lower bound
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.transpositionTable.store(gameState.hash, depth, bound, bestEval, bestMove)
+        if initialCall:
+            self.bestEval = bestEval
+        return bestMove if initialCall else bestEval #returns the optimum move if at top of tree, otherwise just the best evaluation
+
+    #Sorts the moves so the ones most likely to cause a cutoff are searched first: the hash move (previous best move), then captures and promotions
+    #by MVV-LVA (most valuable victim, least valuable attacker), then the killer moves for this ply, then the other moves by their history score
+    def orderMoves(self, moves, hashMove, ply):
+        mailbox = self.gameState.position.mailbox
+        killers = self.killers.get(ply, ())
+        history = self.history
+        scores = {}
+        for move in moves:
+            initIndex, endIndex = toSquare(move[0]), toSquare(move[1])
+            gain = self.moveGain(initIndex, endIndex)
+            if move == hashMove:
+                score = HASH_MOVE_ORDER
+            elif gain:
+                score = CAPTURE_ORDER + 10 * gain - attackerValues[mailbox[initIndex]]
+            elif move in killers:
+                score = KILLER_ORDER - killers.index(move)
+            else:
+                score = history[initIndex][endIndex]
+            if self.randomOrdering: #scores are whole numbers, so this only changes the order of moves with equal scores (keeps play varied)
+                score += random.random()
+            scores[move] = score
+        moves.sort(key=scores.__getitem__, reverse=True)
+
+    #Returns the material a move gains (by pieceValues) - the value of the piece taken, plus the value gained by a promoting pawn becoming a queen (0 for a quiet move)
+    def moveGain(self, initIndex, endIndex):
+        position = self.gameState.position
+        pieceMoved = position.mailbox[initIndex]
+        gain = indexValues[position.mailbox[endIndex]]
+        if pieceMoved % 6 == PAWN:
+            if endIndex == position.enPassant: #en passant move, takes a pawn
+                gain += pieceValues["P"]
+            elif (pieceMoved == PAWN and endIndex >= 56) or (pieceMoved == 6+PAWN and endIndex < 8): #promotion
+                gain += pieceValues["Q"] - pieceValues["P"]
+        return gain
+
+    #Records a quiet move which caused a cutoff, as a killer move for the ply and in the history scores (weighted by the depth searched below it)
+    def storeCutoff(self, move, depth, ply):
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:] #only the two most recent killer moves are kept
+        initIndex, endIndex = toSquare(move[0]), toSquare(move[1])
+        self.history[initIndex][endIndex] += depth * depth
+        if self.history[initIndex][endIndex] >= HISTORY_MAX:
+            self.ageHistory()
+
+    #Halves the history scores, so moves which caused cutoffs in earlier searches count for less than recent ones
+    def ageHistory(self):
+        for scores in self.history:
+            scores[:] = [score // 2 for score in scores]
+
+    #Searches only the captures (and promotions) from the current position, until it's quiet - the moving player can also 'stand pat' (keep the
+    #current evaluation, standPat) rather than capture, since they aren't forced to. Each position's captures are evaluated together in one batch
+    def quiescence(self, maximizingPlayer, alpha, beta, standPat=None):
+        gameState = self.gameState
+        self.nodes += 1
+        self.checkLimits()
+        if standPat is None:
+            standPat = self.evaluate()
+        if maximizingPlayer:
+            if standPat >= beta: #already good enough to cause a cutoff
+                return standPat
+            alpha = max(alpha, standPat)
+        else:
+            if standPat <= alpha:
+                return standPat
+            beta = min(beta, standPat)
+
+        moves = gameState.getLegalMoves(aiMove=True)
+        if not moves:
+            if gameState.Checkmate:
+                return -MATE_SCORE if maximizingPlayer else MATE_SCORE
+            return standPat #stalemate
+        mailbox = gameState.position.mailbox
+        captures = {} #maps each capture to its MVV-LVA score
+        for move in moves:
+            initIndex, endIndex = toSquare(move[0]), toSquare(move[1])
+            gain = self.moveGain(initIndex, endIndex)
+            if not gain:
+                continue
+            if self.deltaMargin is not None: #delta pruning - skips captures which can't bring the evaluation back up to alpha (or down to beta), even with a margin of 2 pawns
+                if maximizingPlayer and standPat + (gain + 2) * self.deltaMargin < alpha:
+                    continue
+                if not maximizingPlayer and standPat - (gain + 2) * self.deltaMargin > beta:
+                    continue
+            captures[move] = 10 * gain - attackerValues[mailbox[initIndex]]
+        if not captures: #position is quiet
+            return standPat
+        captures = sorted(captures, key=captures.__getitem__, reverse=True)
+
+        childEvals = self.evaluateChildren(captures)
+        bestEval = standPat
+        for child in captures:
+            gameState.movePiece(child[0], child[1])
+            eval = self.quiescence(not maximizingPlayer, alpha, beta, childEvals[child])
+            gameState.revMove()
+            if maximizingPlayer:
+                bestEval = max(bestEval, eval)
+                alpha = max(alpha, eval)
+            else:
+                bestEval = min(bestEval, eval)
+                beta = min(beta, eval)
+            if beta <= alpha:
+                break
+        return bestEval
+
+    #Evaluates the current position with the neural network
+    def evaluate(self):
+        hash = self.gameState.hash
+        eval = self.evalCache.probe(hash)
+        if eval is None:
+            eval = float(self.evaluateBatch([self.encodeBoard()])[0])
+            self.evalCache.store(hash, eval)
+        return eval
+
+    #Evaluates a list of encoded boards with a single forward pass through the network, returning one value per board
+    def evaluateBatch(self, boards):
+        return np.asarray(self.staticEval.callBatch(np.stack(boards)), dtype=np.float64)
+
+    #Maps each move to the evaluation of the position it leads to, evaluating all the positions which haven't already been evaluated in one batch
+    def evaluateChildren(self, moves):
+        gameState = self.gameState
+        evalCache = self.evalCache
+        evals = {}
+        boards = [] #encoded boards waiting to be evaluated
+        pending = [] #the move and position hash for each waiting board
+        for child in moves:
+            gameState.movePiece(child[0], child[1])
+            eval = evalCache.probe(gameState.hash)
+            if eval is not None: #position has already been evaluated
+                evals[child] = eval
+            else:
+                boards.append(self.encodeBoard())
+                pending.append((child, gameState.hash))
+            gameState.revMove()
+        if boards:
+            for (child, hash), eval in zip(pending, self.evaluateBatch(boards)):
+                evals[child] = float(eval)
+                evalCache.store(hash, evals[child]) #cached to save re-evaluating the position if it's reached again
+        return evals
+
+    #Turns the current board into a ndim-1 array of the 64 square values (the same encoding used for the training data)
+    def encodeBoard(self):
+        return encodeSquares(self.gameState.position)
+    
+    #Loads the trained model 
+    def loadTrainedModel(self):
+        variables = loadVariables(MODEL_PATH, TEXT_MODEL_PATH) #memory-maps the save of the trained model (converting the old text save if there isn't one yet)
+        if self.useNumpy:
+            self.staticEval = NumpyModel(variables) #inference-only copy of the network, doesn't need TensorFlow
+            return
+        from train import MyModel #only imported when needed, since importing TensorFlow is slow
+        self.staticEval = MyModel() #instantiates the neural network
+        self.staticEval.call(np.zeros(64, dtype=np.int8)) #have to instantiate weights by making initial call (just on array of zeros)
+        self.staticEval.dotWs = variables["dotWs"] #loads dot layer weights and biases
+        self.staticEval.dotBs = variables["dotBs"]
+        self.staticEval.dense1.set_weights([variables["dense1Ws"], variables["dense1Bs"]]) #loads hidden layer weights and biases
+        self.staticEval.dense2.set_weights([variables["dense2Ws"], variables["dense2Bs"]])
+        self.staticEval.dense3.set_weights([variables["dense3Ws"], variables["dense3Bs"]])
+
+
+
+
+#ChessAI used by a search worker process (each worker has its own, with its own evaluator and transposition table)
+workerAI = None
+
+#Initialises a search worker process
+def initSearchWorker(settings, stopEvent, sharedNodes, searchId):
+    global workerAI
+    workerAI = ChessAI(GameState(), **settings)
+    workerAI.stopEvent = stopEvent #so cancelling the main process's search stops the workers' searches too
+    workerAI.sharedNodes = sharedNodes
+    workerAI.searchId = searchId
+
+#Searches a single root move in a search worker process (see ChessAI.searchMove)
+def searchRootMove(task):
+    return workerAI.searchMove(*task)
@@ -0,0 +1,122 @@
+#Pre-scan of .pgn files - records the byte offset, length and headers of every game in a sidecar index (<file>.pgn.index.npy), so the games worth
+#converting can be picked (and sampled) from their headers before any moves are parsed, which is far slower: python indexGames.py [folder] [filters]
+import os
+import re
+import argparse
+import numpy as np
+
+#one entry per game, in the order they're in the file - header values which are missing or can't be read are stored as UNKNOWN
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4"), ("plies", "<i2"), ("whiteElo", "<i2"), ("blackElo", "<i2"),
+                        ("result", "i1"), ("baseTime", "<i4"), ("increment", "<i4")])
+UNKNOWN = -1
+RESULTS = {"1-0": 1, "1/2-1/2": 0, "0-1": -1} #result codes (the same values as parseGame's game results)
+NO_RESULT = 2 #result code of an unfinished game ("*") or one without a Result tag
+TAG_PATTERN = re.compile(rb'\[(\w+)\s+"(.*)"\]') #header tag line, e.g. [WhiteElo "2000"]
+TIME_CONTROL_PATTERN = re.compile(rb"(?:\d+/)?(\d+)(?:\+(\d+))?") #first period of the TimeControl tag, e.g. 900+5 (seconds, plus seconds added per move)
+
+
+#Path of the file's sidecar index
+def indexPath(file):
+    return file + ".index.npy"
+
+
+#Reads the game headers of the file (without parsing the moves) - each game starts at its Event tag, the first tag of a PGN game
+def scanGames(file):
+    games = []
+    start, headers = None, {}
+    offset = 0
+    with open(file, "rb") as gameFile:
+        for line in gameFile:
+            if line.startswith(b"[Event "): #start of the next game
+                if start is not None:
+                    games.append(indexEntry(start, offset - start, headers))
+                start, headers = offset, {}
+            if line.startswith(b"["):
+                match = TAG_PATTERN.match(line)
+                if match:
+                    headers[match.group(1)] = match.group(2)
+            offset += len(line)
+    if start is not None:
+        games.append(indexEntry(start, offset - start, headers))
+    return np.array(games, dtype=INDEX_DTYPE)
+
+
+#Converts a game's position in the file and its headers into an index entry
+def indexEntry(offset, length, headers):
+    baseTime, increment = UNKNOWN, UNKNOWN
+    match = TIME_CONTROL_PATTERN.match(headers.get(b"TimeControl", b""))
+    if match:
+        baseTime, increment = int(match.group(1)), int(match.group(2) or 0)
+    result = RESULTS.get(headers.get(b"Result", b"").decode("ascii", errors="replace"), NO_RESULT)
+    return (offset, length, headerNumber(headers, b"PlyCount"), headerNumber(headers, b"WhiteElo"), headerNumber(headers, b"BlackElo"), result, baseTime, increment)
+
+
+#Returns a header's value as a number (UNKNOWN if it's missing or isn't a number)
+def headerNumber(headers, tag):
+    try:
+        return min(int(headers[tag]), np.iinfo(np.int16).max)
+    except (KeyError, ValueError):
+        return UNKNOWN
+
+
+#Returns the file's index - building and saving it if there isn't one, or if the file has changed since it was built
+def loadIndex(file):
+    path = indexPath(file)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(file):
+        return np.load(path)
+    index = scanGames(file)
+    with open(path + ".tmp", "wb") as indexFile: #written to a temporary file first, so an interrupted save is never loaded
+        np.save(indexFile, index)
+    os.replace(path + ".tmp", path)
+    return index
+
+
+#Returns the index entries of the games which pass the filters (in file order) - games with an UNKNOWN value fail any filter on that value
+#results are the result codes kept, minElo applies to both players and the base times are in seconds. If sample is given, that many of the games
+#which pass are picked at random (with the seed)
+def selectGames(index, results=(1, 0, -1), minPlies=None, maxPlies=None, minElo=None, minBaseTime=None, maxBaseTime=None, sample=None, seed=None):
+    keep = np.isin(index["result"], results)
+    if minPlies is not None:
+        keep &= index["plies"] >= minPlies
+    if maxPlies is not None:
+        keep &= (index["plies"] <= maxPlies) & (index["plies"] != UNKNOWN)
+    if minElo is not None:
+        keep &= np.minimum(index["whiteElo"], index["blackElo"]) >= minElo
+    if minBaseTime is not None:
+        keep &= index["baseTime"] >= minBaseTime
+    if maxBaseTime is not None:
+        keep &= (index["baseTime"] <= maxBaseTime) & (index["baseTime"] != UNKNOWN)
+    games = index[keep]
+    if sample is not None and sample < len(games):
+        games = games[np.sort(np.random.default_rng(seed).choice(len(games), sample, replace=False))]
+    return games
+
+
+#Adds the game filters to a command line parser (used by this file and parseGames.py)
+def addFilterArguments(parser):
+    parser.add_argument("--results", default="1-0,0-1,1/2-1/2", help="comma separated results of the games kept")
+    parser.add_argument("--min-plies", type=int, help="minimum number of moves (plies) in a game, from its PlyCount tag")
+    parser.add_argument("--max-plies", type=int, help="maximum number of moves (plies) in a game")
+    parser.add_argument("--min-elo", type=int, help="minimum Elo rating of both players")
+    parser.add_argument("--min-base-time", type=int, help="minimum starting time on the clock in seconds, from the TimeControl tag")
+    parser.add_argument("--max-base-time", type=int, help="maximum starting time on the clock in seconds")
+    parser.add_argument("--sample", type=int, help="number of games picked at random from each file (after filtering)")
+    parser.add_argument("--seed", type=int, help="random seed for --sample")
+
+
+#Returns the keyword arguments for selectGames from the parsed command line arguments
+def filtersFromArguments(args):
+    return {"results": [RESULTS.get(result.strip(), NO_RESULT) for result in args.results.split(",")], "minPlies": args.min_plies, "maxPlies": args.max_plies,
+            "minElo": args.min_elo, "minBaseTime": args.min_base_time, "maxBaseTime": args.max_base_time, "sample": args.sample, "seed": args.seed}
+
+
+if __name__ == "__main__": #builds the indexes of the .pgn files in the folder, printing how many games pass the filters
+    parser = argparse.ArgumentParser(description="Indexes the games in .pgn files")
+    parser.add_argument("folder", nargs="?", default="./Games", help="folder containing the .pgn files")
+    addFilterArguments(parser)
+    args = parser.parse_args()
+    for file in sorted(os.listdir(args.folder)):
+        if file.endswith(".pgn"):
+            index = loadIndex(os.path.join(args.folder, file))
+            games = selectGames(index, **filtersFromArguments(args))
+            print(f"{file}: {len(index)} games, {len(games)} selected ({games['length'].sum() / 1024 / 1024:.1f}MB)")
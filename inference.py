@@ -0,0 +1,57 @@
+#Runs the trained network with NumPy, so the game doesn't need TensorFlow to evaluate positions
+import numpy as np
+from weights import loadVariables
+from encoding import PIECE_CODES, PLANE_VALUE
+
+INPUT_VALUES = np.array([0, PLANE_VALUE], dtype=np.float32) #values the network's inputs can take (see encoding.encodePlanes)
+
+
+#Inference-only version of MyModel - performs the training=False path of MyModel.call with NumPy matmuls
+class NumpyModel:
+
+    def __init__(self, variables, hiddenUnits=2048):
+        self.dotWs = np.ascontiguousarray(variables["dotWs"], dtype=np.float32)
+        self.dense1Ws = np.ascontiguousarray(variables["dense1Ws"], dtype=np.float32).reshape(1, hiddenUnits)
+        self.dense1Bs = np.ascontiguousarray(variables["dense1Bs"], dtype=np.float32)
+        self.dense2Ws = np.ascontiguousarray(variables["dense2Ws"], dtype=np.float32) #used as they are if already float32 (e.g. memory-mapped from the save)
+        self.dense2Bs = np.ascontiguousarray(variables["dense2Bs"], dtype=np.float32)
+        self.dense3Ws = np.ascontiguousarray(variables["dense3Ws"], dtype=np.float32)
+        self.dense3Bs = np.ascontiguousarray(variables["dense3Bs"], dtype=np.float32)
+        #buffers for the hidden layer outputs (one row per input value)
+        self.hidden1 = np.empty((len(INPUT_VALUES), hiddenUnits), dtype=np.float32)
+        self.hidden2 = np.empty((len(INPUT_VALUES), hiddenUnits), dtype=np.float32)
+        #each of the 768 inputs is fed through the layers on its own (dense1 has a single input unit), so inputs with the same value give the same output -
+        #the output for each value the inputs can take only depends on the weights, so it's worked out once here rather than on every call
+        self.valueOutputs = self.forward(INPUT_VALUES)
+
+    #Creates the model from the saved trained variables (see weights.loadVariables)
+    @classmethod
+    def fromFile(cls, path="model1.bin", textPath="model1.txt"):
+        return cls(loadVariables(path, textPath))
+
+    #Evaluates a single board (a 64 element array of square values), same as MyModel.call(board, training=False)
+    def call(self, input):
+        return self.callBatch(np.asarray(input).reshape(1, 64))[0]
+
+    #Evaluates a batch of boards (one per row), returning one value per board
+    def callBatch(self, inputs):
+        pieces = np.isin(np.asarray(inputs), PIECE_CODES).sum(axis=-1) #number of inputs set to PLANE_VALUE for each board (one for each occupied square)
+        outputs = (768 - pieces) * self.valueOutputs[0] + pieces * self.valueOutputs[1] #sums each board's 768 outputs into a single value
+        return np.abs(outputs) #takes the absolute value, as MyModel does
+
+    #Feeds each of the given input values through the network, returning the output of the final dot layer for each one
+    def forward(self, values):
+        hidden1, hidden2 = self.hidden1, self.hidden2
+        np.multiply(values[:, None], self.dense1Ws, out=hidden1) #first layer has a single input, so its matmul is an outer product
+        self.relu(hidden1, self.dense1Bs)
+        np.matmul(hidden1, self.dense2Ws, out=hidden2)
+        self.relu(hidden2, self.dense2Bs)
+        np.matmul(hidden2, self.dense3Ws, out=hidden1)
+        self.relu(hidden1, self.dense3Bs)
+        return (hidden1 @ self.dotWs).astype(np.float64)
+
+    #Adds the biases and applies the ReLU activation, in place
+    @staticmethod
+    def relu(layer, biases):
+        np.add(layer, biases, out=layer)
+        np.maximum(layer, 0, out=layer)
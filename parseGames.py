@@ -1,132 +1,291 @@
 import chess.pgn
+import io
 import os
+import glob
+import json
+import hashlib
+import argparse
 import multiprocessing
 import h5py
 import numpy as np
-from random import choice
+from random import choice, sample, randrange
+from encoding import encodeSquares
+from indexGames import loadIndex, selectGames, addFilterArguments, filtersFromArguments
 
-def getInputFiles(files=[], folder="./Games"):
+SHARD_SIZE = 64 * 1024 * 1024 #bytes of PGN converted by each task - larger files are split into shards of games adding up to about this size, so they're converted in parallel
+COPY_ROWS = 1 << 16 #number of rows copied at once when merging the shards' datasets
+BUFFER_ROWS = 8192 #number of parsed rows kept in memory before they're written to the datasets together
+CHUNK_ROWS = 8192 #rows in each chunk of the datasets - train.py reads whole datasets in order, so large chunks (512KB of boards) keep the reads sequential
+COMPRESSIONS = ("none", "lzf", "gzip") #lzf is fast, gzip compresses more (with a level from 0-9)
+#ways the positions kept from each game are picked: positionsPerGame at random, every position, or one at random from each of positionsPerGame
+#equal parts of the game (so positions from the opening, middlegame and endgame are all kept, however long the game is)
+SAMPLINGS = ("random", "all", "stratified")
+#datasets written for each file: the position (xq), its parent (xp) and a random child of the parent (xr) as 64 square values, the game result (y) and moves until the game ended (m)
+DATASET_SHAPES = {"xp": (64,), "xq": (64,), "xr": (64,), "y": (), "m": ()}
+DATASET_DTYPES = {"xp": "b", "xq": "b", "xr": "b", "y": "b", "m": "i2"} #signed bytes, apart from the moves left (which can be more than 127)
+
+#Converts the .pgn files in the folder which haven't been converted yet - only the games which pass the filters (see indexGames.selectGames) are parsed
+#Finished shards are kept if the conversion is interrupted, so running it again (with the same filters) carries on from where it stopped - the shards of a run
+#with different filters, settings or games picked (e.g. an unseeded --sample) are deleted and converted again
+#settings are the keyword arguments readAllGames is called with (compression, compressionLevel, sampling, positionsPerGame)
+def getInputFiles(files=[], folder="./Games", workers=None, shardSize=SHARD_SIZE, filters={}, settings={}):
+    if settings.get("positionsPerGame", 1) < 1: #checked here, rather than failing in the worker processes partway through the conversion
+        raise ValueError("positionsPerGame must be at least 1")
 
     for fileIn in os.listdir(folder): #iterates through all game files in 'Games'
         if fileIn.endswith(".pgn"): #if file already converted to HDF5, skip
-            fileIn = os.path.join(folder, fileIn) #define full path for file 
+            fileIn = os.path.join(folder, fileIn) #define full path for file
             fileOut = fileIn.replace(".pgn", ".hdf5") #convert file from pgn to HDF5
             if not os.path.exists(fileOut): #Check file doesn't already exist
                 files.append((fileIn, fileOut)) #add input/output files to list of files
 
     print(files)
-    #pool = multiprocessing.Pool() #Pools the available processors/cores, meaning they can process the games in parallel
-    for filePair in files:
-        readAllGames(filePair) #Parses and processes the contents of the given .pgn file, writing it's ouput to the paired .hdf5 file 
-        print(f"Finished reading: {filePair}") #Indicates when the last file finished being parsed
-    
+    tasks = [] #(input file, output file, shard number, (offset, length) of each game, settings) of each shard to convert
+    shardCounts = {} #number of shards each output file is split into
+    shardsLeft = {} #number of shards of each output file which haven't been converted yet
+    for fileIn, fileOut in files:
+        games = selectGames(loadIndex(fileIn), **filters) #picks the games to parse from their headers, without parsing their moves
+        print(f"{fileIn}: parsing {len(games)} games")
+        shards = shardGames(games, shardSize)
+        shardCounts[fileOut] = shardsLeft[fileOut] = len(shards)
+        checkManifest(fileOut, shardManifest(shards, filters, settings))
+        for index, shard in enumerate(shards):
+            if os.path.exists(shardPath(fileOut, index)): #already converted by an earlier (interrupted) run
+                shardsLeft[fileOut] -= 1
+            else:
+                tasks.append((fileIn, fileOut, index, shard, settings))
+
+    compression, compressionLevel = settings.get("compression"), settings.get("compressionLevel") #used for the merged datasets too
+    for fileIn, fileOut in files:
+        if not shardsLeft[fileOut]: #all of the file's shards were converted by an earlier run
+            mergeShards(fileOut, shardCounts[fileOut], compression, compressionLevel)
+    with multiprocessing.Pool(workers) as pool: #Pools the available processors/cores, meaning they can process the games in parallel
+        for fileIn, fileOut, *shard in pool.imap_unordered(convertShard, tasks): #shards are returned as they finish
+            shardsLeft[fileOut] -= 1
+            if not shardsLeft[fileOut]: #all of the file's shards have been converted
+                mergeShards(fileOut, shardCounts[fileOut], compression, compressionLevel)
+                print(f"Finished reading: {(fileIn, fileOut)}") #Indicates when each file has finished being parsed
+
+
+#Splits the index entries of the games into shards of about shardSize bytes of PGN, returns each shard's (offset, length) pairs
+def shardGames(games, shardSize=SHARD_SIZE):
+    if not len(games): #a single empty shard, so the file is still marked as converted
+        return [np.zeros((0, 2), dtype=np.int64)]
+    ranges = np.stack([games["offset"], games["length"]], axis=1).astype(np.int64)
+    ends = np.cumsum(ranges[:, 1])
+    splits = np.flatnonzero(np.diff(ends // shardSize)) + 1 #first game of each new shard
+    return np.split(ranges, splits)
+
+
+#Returns what the shards of a file are converted from - the filters and settings, and a digest of the games in each shard (which covers the sampling seed
+#and the shard size, since they change which games are picked and how they're split)
+def shardManifest(shards, filters, settings):
+    digest = hashlib.sha256()
+    for shard in shards:
+        digest.update(np.int64(len(shard)).tobytes()) #so the same games split differently don't give the same digest
+        digest.update(shard.astype("<i8").tobytes())
+    return json.loads(json.dumps({"filters": filters, "settings": settings, "shards": len(shards), "games": digest.hexdigest()})) #as it's read back from the file (lists rather than tuples)
+
+
+#Deletes the file's existing shards if they were converted by a run with a different manifest, then saves the manifest for the shards converted now
+def checkManifest(fileOut, manifest):
+    path = manifestPath(fileOut)
+    try:
+        with open(path) as manifestFile:
+            previous = json.load(manifestFile)
+    except (OSError, ValueError): #no manifest (or an unreadable one), so any shards can't be trusted
+        previous = None
+    if previous != manifest:
+        for stalePath in glob.glob(glob.escape(fileOut) + ".shard*"):
+            os.remove(stalePath)
+    with open(path + ".tmp", "w") as manifestFile:
+        json.dump(manifest, manifestFile)
+    os.replace(path + ".tmp", path)
+
+
+#File recording what the output file's shards were converted from, kept until the shards are merged
+def manifestPath(fileOut):
+    return f"{fileOut}.manifest"
+
+
+#Output file a shard of the games is written to, before the shards are merged
+def shardPath(fileOut, index):
+    return f"{fileOut}.shard{index}" #not ending in .hdf5, so an unmerged shard isn't read as training data
+
+
+#Converts a shard of a .pgn file's games in a worker process, writing it to its own .hdf5 file (renamed once it's complete, so only finished shards are kept)
+def convertShard(task):
+    fileIn, fileOut, index, games, settings = task
+    readAllGames((fileIn, shardPath(fileOut, index) + ".tmp"), games, **settings)
+    os.replace(shardPath(fileOut, index) + ".tmp", shardPath(fileOut, index))
+    return task
+
+
+#Joins the shards' datasets (in order) into the output file - written to a temporary file first, so a partially merged file is never mistaken for a converted one
+def mergeShards(fileOut, shardCount, compression=None, compressionLevel=None):
+    shardPaths = [shardPath(fileOut, index) for index in range(shardCount)]
+    if shardCount == 1: #the only shard already is the output file
+        os.replace(shardPaths[0], fileOut)
+        os.remove(manifestPath(fileOut))
+        return
+    shards = [h5py.File(path, "r") for path in shardPaths]
+    try:
+        with h5py.File(fileOut + ".tmp", "w") as gameDataset:
+            datasets = createDatasets(gameDataset, sum(len(shard["y"]) for shard in shards), compression, compressionLevel)
+            line = 0
+            for shard in shards:
+                rows = len(shard["y"])
+                for start in range(0, rows, COPY_ROWS): #copies a block of rows at a time, so a shard doesn't have to fit in memory
+                    stop = min(start + COPY_ROWS, rows)
+                    for datasetName, dataset in datasets.items():
+                        dataset[line+start:line+stop] = shard[datasetName][start:stop]
+                line += rows
+    finally:
+        for shard in shards:
+            shard.close()
+    os.replace(fileOut + ".tmp", fileOut)
+    for path in shardPaths:
+        os.remove(path)
+    os.remove(manifestPath(fileOut))
+
 
+#Creates the (resizable) datasets in the file with the given number of rows, returns a dict of them by name
+#compression is None (or "none"), "lzf" or "gzip" - compressionLevel is only used by gzip
+def createDatasets(gameDataset, size=0, compression=None, compressionLevel=None):
+    compression = None if compression == "none" else compression
+    compressionLevel = compressionLevel if compression == "gzip" else None
+    return {datasetName: gameDataset.create_dataset(datasetName, (size,) + shape, dtype=DATASET_DTYPES[datasetName], maxshape=(None,) + shape,
+                                                    chunks=(CHUNK_ROWS,) + shape, compression=compression, compression_opts=compressionLevel)
+            for datasetName, shape in DATASET_SHAPES.items()} #has ~unlimited size, and is stored as chunked storage to allow resizing in the future
 
-def readAllGames(files):    
-    fileIn, fileOut = files #unpack input and output games 
+
+#Writes the first rows of the buffers to the end of the datasets (one slice per dataset), returns the new number of rows in the datasets
+def writeRows(datasets, buffers, rows, line):
+    for datasetName, dataset in datasets.items():
+        dataset.resize(line + rows, axis=0)
+        dataset[line:line+rows] = buffers[datasetName][:rows]
+    return line + rows
+
+
+#Parses the games (all of the file's, or the ones at the given byte ranges) and writes their training examples to the output file
+#sampling and positionsPerGame pick the positions kept from each game (see pickPositions)
+def readAllGames(files, games=None, compression=None, compressionLevel=None, sampling="random", positionsPerGame=1):
+    fileIn, fileOut = files #unpack input and output games
     with h5py.File(fileOut, "w") as gameDataset: #create HDF5 object to initialise the datasets for this game
-        Xp, Xq, Xr = [gameDataset.create_dataset(datasetName, (0, 64), dtype="b", maxshape=(None, 64), chunks=True) for datasetName in ["xp", "xq", "xr"]] #initialise subgroups (datasets) for positions (p,q,r)
-        Y, M = [gameDataset.create_dataset(datasetName, (0,), dtype="b", maxshape=(None,), chunks=True) for datasetName in ["y", "m"]] #initialise subgroups for moves till game end (M) and game result (Y)
-                                               #signed byte     #has ~unlimited size   #dataset stored as chunked storage, to allow resizing in the future
-        
-        size = 0 #max number of lines which can be written
+        datasets = createDatasets(gameDataset, 0, compression, compressionLevel) #initialise subgroups (datasets) for positions (p,q,r), moves till game end (M) and game result (Y)
+        #parsed rows are collected here, then written to the datasets together (a single slice for each dataset) once the buffers are full
+        buffers = {datasetName: np.empty((BUFFER_ROWS,) + shape, dtype=DATASET_DTYPES[datasetName]) for datasetName, shape in DATASET_SHAPES.items()}
+        buffered = 0 #number of rows in the buffers
         line = 0 #denotes the number of lines in the datasets which have been written to
-        for gameSequence in readGames(fileIn): #iterate through the returned generator for move sequences
+        for gameSequence in readGames(fileIn, games): #iterate through the returned generator for move sequences
             print("#####################")
-            print(f"Reading game #{line}...")
+            print(f"Reading game #{line + buffered}...")
             print("#####################")
-            game = parseGame(gameSequence) #returns the flattened boards, moves until the game ends from said boards, and the game result
-            if game is None: #discard training example if the game wasnt over in the final move
+            examples = parseGame(gameSequence, sampling, positionsPerGame) #returns the flattened boards, moves until the game ends from said boards, and the game result
+            if examples is None: #discard training example if the game wasnt over in the final move
                 print("\nSkipping training example...\n")
                 continue
-            x, xParent, xRandom, movesLeft, y = game 
-
-            if line + 1 >= size: #dataset has reached it's maximum size
-                gameDataset.flush() #flush the hdf5 buffers, to prevent the buffered data being written to disk (and exceeding the max size)
-                size = 2 * size + 1 #increase max size of dataset 
-                print(f"Resizing to size: {size}")
-                [gameDataset[datasetName].resize(size, axis=0) for datasetName in ("xp", "xr", "xq", "y", "m")]
-
-            #update all datasets with the parsed boards/data
-            Xq[line] = x 
-            Xr[line] = xRandom
-            Xp[line] = xParent
-            Y[line] = y
-            M[line] = movesLeft
-
-            line += 1 #each game is 1 line in the dataset
-
-        [gameDataset[datasetName].resize(line, axis=0) for datasetName in ("xp", "xr", "xq", "y", "m")] #resizes datasets, releasing unused storage (line denotes the number of lines which have been written) 
-    
-def parseGame(game):
+
+            for x, xParent, xRandom, movesLeft, y in examples:
+                #update all buffers with the parsed boards/data
+                buffers["xq"][buffered] = x
+                buffers["xr"][buffered] = xRandom
+                buffers["xp"][buffered] = xParent
+                buffers["y"][buffered] = y
+                buffers["m"][buffered] = movesLeft
+
+                buffered += 1 #each training example is 1 line in the dataset
+                if buffered == BUFFER_ROWS:
+                    line = writeRows(datasets, buffers, buffered, line)
+                    buffered = 0
+
+        writeRows(datasets, buffers, buffered, line) #writes the remaining rows
+
+#Returns a list of training examples from the game, each as (board, parent board, random child of the parent board, moves until the game ends, game result)
+#The game's moves are replayed once on a single board, and the positions kept (see pickPositions) are encoded as they're reached
+def parseGame(game, sampling="random", positionsPerGame=1):
     endConditions = {"1-0": 1, "1/2-1/2": 0, "0-1": -1} #maps end-game conditions from the move sequences
-    result = game.headers["Result"] #access game result from game headers 
+    result = game.headers["Result"] #access game result from game headers
     if result not in endConditions: #means a player timed out, so we discard training example
         return None
     y = endConditions[result] #store translated game result in y
 
-    endNode = game.end() #fetches the last node in the move sequence
-    if not endNode.board().is_game_over(): #if in the final board state the game isn't over, discard training example
+    moves = list(game.mainline_moves()) #the moves leading to the last node in the move sequence
+    if not moves:
         return None
+    kept = pickPositions(len(moves), sampling, positionsPerGame) #moves left (from each position to the end of the game) of the positions kept
 
-    nodes = [] #tracks information on nodes(moves) in the game, starting from the end node
-    movesLeft = 0 #moves to get from current node to end node
-    while endNode: #until all moves are parsed
-        nodes.append((movesLeft, endNode, endNode.board().turn)) #'turn' returns True if white to move and False if black to move (in the current node)
-        endNode = endNode.parent #fetches the node above the current node (nodes are stored in a tree)
-        movesLeft += 1 #since current node is now 1 more move above the end node
-
-    nodes.pop() #remove node representing board with no moves made
+    examples = []
+    board = game.board() #board before any moves are made
+    for ply, move in enumerate(moves):
+        movesLeft = len(moves) - ply - 1 #moves to get from the position after this move to the end of the game
+        if movesLeft not in kept:
+            board.push(move)
+            continue
+        xParent = encodeSquares(board) #converts the previous board into flattened array (see encoding.py)
+        # generate a random baord
+        board.push(choice(list(board.legal_moves))) #makes a random move from all the possible moves which could have been made from the previous board
+        xRandom = encodeSquares(board) #converts this 'random' board into a flattened array
+        board.pop()
+        board.push(move)
+        x = encodeSquares(board) #converts the board into a flattened 64-element array of squares
+        examples.append((x, xParent, xRandom, movesLeft, y if board.turn else -y)) #negate game result when black is to move, so the result for a won game is constant (1) for either side
 
-    movesLeft, endNode, whiteMove = choice(nodes) #randomly chooses node from game
-
-    board = endNode.board() #get the board from the random node
-    x = baseBoardToArray(board) #converts the board into a flattened 64-element array of squares 
-    boardParent = endNode.parent.board() #get the board from before the move was made 
-    xParent = baseBoardToArray(boardParent) #converts the previous board into flattened array
-    if not whiteMove:
-        y = -y #negate game result, so the reuslt for a won game is constant (1) for either side
-
-    # generate a random baord
-    moves = list(boardParent.legal_moves) #gets list of all the possible moves which could have been made from the previous board variation
-    move = choice(moves) #returns randomly selected move from list of legal moves
-    boardParent.push(move) #makes the (random) move, which is reflected on the board
-    xRandom = baseBoardToArray(boardParent) #converts this 'random' board into a flattened array
-
-    return (x, xParent, xRandom, movesLeft, y) #returns the flattened boards, moves until the game ends, and the game result
-
-def readGames(file):
-    with open(file) as gameFile:
-        while True: 
-            try:
-                game = chess.pgn.read_game(gameFile) #reads the game (move) sequence from file
-            except KeyboardInterrupt: #stop executution if Ctrl-c pressed
-                raise
-
-            if not game: #if all games read from file, stop reading
-                break
-        
-            yield game #return genreator, so program doesn't have to parse all games at once
-
-
-def baseBoardToArray(board): #converts the standard chess board into a flattened array
-    boardArray = np.zeros(64, dtype=np.int8) #array of 64 8-bit integers, squares which aren't occupied will be left as 0
-    for square in range(64): #iterate through the 64 squares on board
-        piece = board.piece_type_at(square) #returns the integer representing the piece at given square (e.g. ROOK=4)
-        if piece: #piece will be None if square was empty
-            colour = int(bool(board.occupied_co[chess.BLACK] & chess.BB_SQUARES[square])) #occupied_co returns a 64-bit integer mask of the squares occupied by the given player, BB_squares returns the integer mask for the passed square
-                                                                                      #Using bitwise 'and' (&), it can be deduced which player occupies the given square
-            col = square % 8 #convert mask to board indexes 
-            row = square // 8
-            piece = (colour*7) + piece #used to distinguish between white and black pieces. Max value of original piece_type is 6, so we add 7 if it's a white piece.
+    if not board.is_game_over(): #if in the final board state the game isn't over, discard training example
+        return None
+    return examples
 
-            boardArray[row * 8 + col] = piece #We insert values from the same row in the same sequence of 8 indexes - which uses the fact that rows are 8 squares 'apart'
+#Command line argument type for counts which must be at least 1
+def positiveInt(value):
+    value = int(value)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return value
 
-    return boardArray
+#Returns the set of positions kept from a game of the given number of moves (plies), each given by its number of moves left until the end of the game
+def pickPositions(plies, sampling="random", positionsPerGame=1):
+    if sampling == "all":
+        return set(range(plies))
+    if sampling == "stratified": #splits the game into positionsPerGame parts (fewer for short games), and picks a position from each
+        bounds = [plies * part // positionsPerGame for part in range(positionsPerGame + 1)]
+        return {randrange(start, end) for start, end in zip(bounds, bounds[1:]) if start < end}
+    if sampling == "random":
+        return set(sample(range(plies), min(positionsPerGame, plies)))
+    raise ValueError("unknown sampling: " + sampling)
 
+#Reads the games from the file - or only the games at the given (offset, length) byte ranges of it (see indexGames)
+def readGames(file, games=None):
+    if games is None:
+        with open(file) as gameFile:
+            while True:
+                try:
+                    game = chess.pgn.read_game(gameFile) #reads the game (move) sequence from file
+                except KeyboardInterrupt: #stop executution if Ctrl-c pressed
+                    raise
 
+                if not game: #if all games read from file, stop reading
+                    break
 
+                yield game #return genreator, so program doesn't have to parse all games at once
+        return
+    with open(file, "rb") as gameFile:
+        for offset, length in games:
+            gameFile.seek(offset)
+            game = chess.pgn.read_game(io.StringIO(gameFile.read(length).decode("utf-8", errors="replace")))
+            if game:
+                yield game
 
 
 if __name__ == "__main__":
-    getInputFiles()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Converts the .pgn files of games into .hdf5 training data")
+    parser.add_argument("--folder", default="./Games", help="folder containing the .pgn files")
+    parser.add_argument("--workers", type=int, help="number of worker processes (the number of cores by default)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE // (1024 * 1024), help="size in MB of the shards larger files are split into")
+    parser.add_argument("--sampling", choices=SAMPLINGS, default="random", help="how the positions kept from each game are picked")
+    parser.add_argument("--positions-per-game", type=positiveInt, default=1, help="number of positions kept from each game (for random and stratified sampling)")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none", help="compression of the datasets")
+    parser.add_argument("--compression-level", type=int, default=4, help="gzip compression level (0-9)")
+    addFilterArguments(parser)
+    args = parser.parse_args()
+    getInputFiles(folder=args.folder, workers=args.workers, shardSize=args.shard_size * 1024 * 1024, filters=filtersFromArguments(args),
+                  settings={"compression": args.compression, "compressionLevel": args.compression_level, "sampling": args.sampling, "positionsPerGame": args.positions_per_game})
@@ -0,0 +1,106 @@
+#Perft (counting the positions reached by every sequence of legal moves) for checking and timing GameState's move generation
+#python perft.py <depth> [--fen <fen>] [--divide] counts a single position, python perft.py --suite checks and times the positions in PERFT_SUITE
+import sys
+import time
+import argparse
+from engine import GameState, STARTING_FEN
+from uci import moveToUci
+
+#(name, FEN, depth, number of positions) - pawns only promote to queens in GameState, so positions with promotions have lower counts than the
+#usual (all promotions) values, these were counted with python-chess ignoring underpromotions
+PERFT_SUITE = (
+    ("start", STARTING_FEN, 4, 197281),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 3, 97862),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 4, 43238),
+    ("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, 8087),
+    ("promotionCapture", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 3, 54007),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", 3, 89890),
+    ("enPassantPinned", "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", 4, 10138),
+    ("enPassantCheck", "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", 4, 13931),
+    ("castlingAttacked", "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", 3, 27826),
+    ("castlingRookTaken", "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", 3, 50509),
+    ("promotion", "4k3/1P6/8/8/8/8/K7/8 w - - 0 1", 4, 1379),
+    ("promotionCheck", "8/P1k5/K7/8/8/8/8/8 w - - 0 1", 4, 553),
+    ("promotionCorner", "K1k5/8/P7/8/8/8/8/8 w - - 0 1", 4, 63),
+    ("stalemate", "8/k1P5/8/1K6/8/8/8/8 w - - 0 1", 4, 498),
+    ("doubleCheck", "8/5k2/8/5N2/5Q2/2K5/8/8 w - - 0 1", 4, 23527),
+)
+
+
+#Returns the number of positions reached after depth moves (plies)
+def perft(gameState, depth):
+    if depth == 0:
+        return 1
+    moves = gameState.getLegalMoves(aiMove=True)
+    if depth == 1: #the positions after the last move don't need to be made, just counted
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gameState.movePiece(move[0], move[1])
+        nodes += perft(gameState, depth-1)
+        gameState.revMove()
+    return nodes
+
+
+#Returns the perft count below each legal move, as a list of (UCI move, positions) - used to find which move a wrong count comes from
+def divide(gameState, depth):
+    counts = []
+    for move in gameState.getLegalMoves(aiMove=True):
+        uci = moveToUci(gameState, move)
+        gameState.movePiece(move[0], move[1])
+        counts.append((uci, perft(gameState, depth-1)))
+        gameState.revMove()
+    return counts
+
+
+#Counts each position in the suite, printing the count, time and nodes per second for each - returns the names of the positions with the wrong count
+def runSuite(suite=PERFT_SUITE, maxDepth=None):
+    failed = []
+    totalNodes, totalTime = 0, 0
+    print("{:<20}{:>6}{:>10}{:>10}{:>9}{:>11}".format("position", "depth", "nodes", "expected", "time", "nodes/s"))
+    for name, fen, depth, expected in suite:
+        if maxDepth is not None and depth > maxDepth: #counts at lower depths aren't known, so deeper positions are skipped
+            continue
+        gameState = GameState.fromFen(fen)
+        start = time.perf_counter()
+        nodes = perft(gameState, depth)
+        elapsed = time.perf_counter() - start
+        totalNodes += nodes
+        totalTime += elapsed
+        if nodes != expected:
+            failed.append(name)
+        print("{:<20}{:>6}{:>10}{:>10}{:>8.2f}s{:>11.0f}{}".format(name, depth, nodes, expected, elapsed, nodes / elapsed, "" if nodes == expected else "  FAILED"))
+    print("{:<20}{:>6}{:>10}{:>10}{:>8.2f}s{:>11.0f}".format("total", "", totalNodes, "", totalTime, totalNodes / max(totalTime, 1e-9)))
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft for GameState's move generation")
+    parser.add_argument("depth", type=int, nargs="?", help="number of moves (plies) to count to")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to count from (the starting position by default)")
+    parser.add_argument("--divide", action="store_true", help="print the count below each legal move")
+    parser.add_argument("--suite", action="store_true", help="check and time the positions in the benchmark suite")
+    parser.add_argument("--max-depth", type=int, help="skip suite positions counted deeper than this")
+    args = parser.parse_args()
+    if args.suite:
+        failed = runSuite(maxDepth=args.max_depth)
+        if failed:
+            print("wrong counts: " + ", ".join(failed))
+        sys.exit(1 if failed else 0)
+    if args.depth is None:
+        parser.error("a depth is needed (or --suite)")
+    gameState = GameState.fromFen(args.fen)
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(gameState, args.depth)
+        for uci, nodes in counts:
+            print("{}: {}".format(uci, nodes))
+        nodes = sum(nodes for uci, nodes in counts)
+    else:
+        nodes = perft(gameState, args.depth)
+    elapsed = time.perf_counter() - start
+    print("nodes {} time {:.2f}s nodes/s {:.0f}".format(nodes, elapsed, nodes / max(elapsed, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import os
 from typing import Type
 import h5py
 import numpy as np
+import weights
+from encoding import encodePlanes
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow import sigmoid
@@ -97,18 +99,8 @@ def train():
 
     #print(lossObject.call())
     #model.compile(optimizer="adam", loss=LogLikelihood(xqOutput,XpTrain[0], XrTrain[0], model))
-def saveVariables(variables):
-  with open("model1.txt", "w") as file: #file for the trained model to be saved to
-    for variable in variables: #itertes through each of the passed variables
-      contents = [] #list for tensor's elements to be appended to
-      if len(variable.shape) == 2: #for dense layer variables (shape=(768,2048))
-        for i in range(variable.shape[0]): #iterates through rows in tensor
-          for j in range(variable.shape[1]): #iterates elements in said rows (columns)
-            contents.append(float(variable[i][j])) #copies each element by value to the content list
-      else: #for dot layer variables
-        for i in range(variable.shape[0]): #iterates through each element in the tensor
-          contents.append(float(variable[i])) #copies each element by value to the content list
-      file.write(str(contents)+"\n") #appends the current variables contents to the file, followed by a new line for readability
+def saveVariables(variables, path="model1.bin"):
+  weights.saveVariables([np.asarray(variable) for variable in variables], path) #saves the variables' values in the binary format (see weights.py), which the game memory-maps
     
       
 #Defines the structure and functionality of the neural network 
@@ -191,13 +183,22 @@ class MyModel(tf.keras.Model): #Inherits from the tensorflow Model class, allowi
       input = tf.tensordot(input, self.dotOnes, axes=1) #turns output vector into single value
       return tf.math.abs(input) #returns the absolute value of the output (sometimes it's negative)
 
+  #Evaluates a batch of boards (one per row) with a single forward pass, returning one value per board (the same values as call(board, training=False))
+  def callBatch(self, inputs):
+    inputs = self.getInputVector(np.asarray(inputs)) #converts each board to a row of 768 bits, shape (boards, 768)
+    #each of the 768 inputs is fed through the layers on its own (dense1 has a single input unit), so inputs with the same value give the same output - 
+    #the layers are run once for each distinct input value (only 0 and 10 occur) and the outputs are gathered back into place
+    values, valueIndexes = tf.unique(tf.reshape(tf.cast(inputs, tf.float32), (-1,)))
+    output = self.dense1(tf.reshape(values, (-1, 1))) #outputs matrix of shape (distinct values, 2048)
+    output = self.dense2(output)
+    output = self.dense3(output)
+    output = tf.tensordot(output, self.dotWs, axes=1) #outputs a vector of shape (distinct values,)
+    output = tf.reshape(tf.gather(output, valueIndexes), tf.shape(inputs)) #the output for every input, shape (boards, 768)
+    return tf.math.abs(tf.reduce_sum(output, axis=1)) #sums each board's outputs into a single value
+
   # Convert input into a 12 * 64 list
   def getInputVector(self, inputBoard):
-    bitBoards = [] #stores the different piece boards
-    for piece in [1,2,3,4,5,6, 8,9,10,11,12,13]: #the different piece 'types'
-      bitBoards.append((((inputBoard == piece)).astype(float))*10) #appends 'board' with '100' on squares where the was piece present, '0' where it wasn't (on the current board)
-                                                                    #results in 12 differnt 'boards' - one for each piece
-    return tf.concat(bitBoards, axis=0) #concatenates the 12 different piece/bit boards into a single list of 768 '100s' and '0s'
+    return encodePlanes(inputBoard) #one plane of '10's and '0's for each piece, concatenated into 768 values (one row per board if given a batch) - see encoding.py
 
 
 
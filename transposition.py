@@ -0,0 +1,78 @@
+#Fixed-size transposition table, stores the results of previous searches so positions reached by different move orders aren't searched again
+#(plus a fixed-size cache of the network's evaluations, so positions reached again aren't re-evaluated)
+import numpy as np
+from bitboard import toSquare, SQUARES
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 1, 2, 3 #bound types (0 marks an empty slot)
+NO_MOVE = -1 #stored when a position has no best move (e.g. leaf nodes)
+ENTRY_BYTES = 8 + 8 + 2 + 1 + 1 #key (uint64), score (float64), move (int16), depth (int8) and bound (int8)
+EVAL_ENTRY_BYTES = 8 + 8 + 1 #key (uint64), evaluation (float64) and whether the slot is used (bool)
+
+
+#Each bucket has two slots: the first keeps the deepest search of the positions which map to it (depth-preferred),
+#the second is always overwritten by the newest entry (always-replace), so recent shallow results are still kept
+class TranspositionTable:
+
+    def __init__(self, sizeMB=16):
+        buckets = max(1, sizeMB * 1024 * 1024 // (2 * ENTRY_BYTES)) #number of buckets which fit in the given memory
+        buckets = 1 << (buckets.bit_length() - 1) #rounded down to a power of 2, so a hash maps to a bucket with a bitmask
+        self.mask = buckets - 1
+        #one array per field (rather than a dict of objects), indexed by [bucket, slot]
+        self.keys = np.zeros((buckets, 2), dtype=np.uint64)
+        self.scores = np.zeros((buckets, 2), dtype=np.float64) #full precision, so reused scores compare equal to freshly searched ones
+        self.moves = np.full((buckets, 2), NO_MOVE, dtype=np.int16)
+        self.depths = np.zeros((buckets, 2), dtype=np.int8)
+        self.bounds = np.zeros((buckets, 2), dtype=np.int8)
+
+    #Returns (depth, bound, score, move) stored for the position's hash, or None if it isn't in the table
+    def probe(self, hash):
+        bucket = hash & self.mask
+        for slot in (0, 1):
+            if self.bounds[bucket, slot] and self.keys[bucket, slot] == hash:
+                move = int(self.moves[bucket, slot])
+                move = (SQUARES[move >> 6], SQUARES[move & 63]) if move != NO_MOVE else None #decodes the move back into ((row, col), (row, col))
+                return int(self.depths[bucket, slot]), int(self.bounds[bucket, slot]), float(self.scores[bucket, slot]), move
+        return None
+
+    #Stores the result of searching the position to the given depth
+    def store(self, hash, depth, bound, score, move):
+        bucket = hash & self.mask
+        #the depth-preferred slot is only replaced by a search of the same position, or one which is at least as deep
+        slot = 0 if not self.bounds[bucket, 0] or self.keys[bucket, 0] == hash or depth >= self.depths[bucket, 0] else 1
+        self.keys[bucket, slot] = hash
+        self.scores[bucket, slot] = score
+        self.moves[bucket, slot] = toSquare(move[0]) << 6 | toSquare(move[1]) if move else NO_MOVE #moves are encoded as (initial square index * 64) + end square index
+        self.depths[bucket, slot] = depth
+        self.bounds[bucket, slot] = bound
+
+    #Empties the table (e.g. when a new game starts)
+    def clear(self):
+        self.bounds.fill(0)
+
+
+#Each hash maps to a single slot, which is always overwritten by the newest evaluation - the memory used never grows, however long the search runs
+class EvalCache:
+
+    def __init__(self, sizeMB=16):
+        slots = max(1, sizeMB * 1024 * 1024 // EVAL_ENTRY_BYTES)
+        slots = 1 << (slots.bit_length() - 1) #rounded down to a power of 2, so a hash maps to a slot with a bitmask
+        self.mask = slots - 1
+        self.keys = np.zeros(slots, dtype=np.uint64)
+        self.evals = np.zeros(slots, dtype=np.float64)
+        self.used = np.zeros(slots, dtype=np.bool_)
+
+    #Returns the evaluation stored for the position's hash, or None if it isn't in the cache
+    def probe(self, hash):
+        slot = hash & self.mask
+        if self.used[slot] and self.keys[slot] == hash:
+            return float(self.evals[slot])
+        return None
+
+    def store(self, hash, eval):
+        slot = hash & self.mask
+        self.keys[slot] = hash
+        self.evals[slot] = eval
+        self.used[slot] = True
+
+    def clear(self):
+        self.used.fill(False)
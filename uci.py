@@ -0,0 +1,212 @@
+#UCI (Universal Chess Interface) front end for the engine, so it can be run by chess GUIs and tournament managers: python uci.py
+import os
+import sys
+import math
+import time
+import threading
+from engine import GameState, ChessAI, MAX_DEPTH, MATE_SCORE, ranksToRows, filesToCols, rowsToRanks, colsToFiles
+
+ENGINE_NAME = "SigmaZero"
+ENGINE_AUTHOR = "thomaspillot"
+DEFAULT_MOVE_TIME = 1.0 #seconds searched for a "go" with no limits
+MOVES_TO_GO = 30 #number of moves the remaining time is shared between, when the GUI doesn't say
+INCREMENT_SHARE = 0.75 #share of the increment spent on each move
+MOVE_OVERHEAD = 0.05 #seconds kept back from each move's time for communicating with the GUI
+GO_LIMITS = ("depth", "nodes", "movetime", "wtime", "btime", "winc", "binc", "movestogo") #"go" parameters followed by a number
+
+
+#Converts a move into UCI notation (e.g. "e2e4") - promotions always have a "q" added, since pawns always promote to a queen
+def moveToUci(gameState, move):
+    uci = colsToFiles[move[0][1]] + rowsToRanks[move[0][0]] + colsToFiles[move[1][1]] + rowsToRanks[move[1][0]]
+    if gameState.pieceAt(move[0])[1:] == "P" and move[1][0] in (0, 7): #pawn reaching the last rank
+        uci += "q"
+    return uci
+
+
+#Converts a move in UCI notation into ((row, col), (row, col)) - the promotion piece is ignored, since pawns always promote to a queen
+def uciToMove(uci):
+    return (ranksToRows[uci[1]], filesToCols[uci[0]]), (ranksToRows[uci[3]], filesToCols[uci[2]])
+
+
+#Reads UCI commands and answers them, searching with ChessAI in a background thread so "stop" and "isready" are answered during a search
+class UCIEngine:
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.gameState = GameState() #position set by the last "position" command
+        self.ai = None #ChessAI, created by the first "isready" or "go" (since loading the model takes a while)
+        self.hashSizeMB = 16
+        self.workers = 1
+        self.searchThread = None #thread running the current "go" command's search
+        self.commands = {"uci": self.uci, "isready": self.isReady, "setoption": self.setOption, "ucinewgame": self.newGame,
+                         "position": self.position, "go": self.go, "stop": self.stop}
+
+    #Answers commands until "quit" (or the end of the input)
+    def run(self, input=sys.stdin):
+        for line in input:
+            if not self.handle(line):
+                break
+        self.stop()
+        if self.ai is not None:
+            self.ai.close()
+
+    #Answers a single command, returns False for "quit"
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        if tokens[0] == "quit":
+            return False
+        if tokens[0] in self.commands:
+            self.commands[tokens[0]](tokens[1:])
+        elif tokens[0] not in ("debug", "register", "ponderhit"): #commands which don't need an answer
+            self.send("info string unknown command " + tokens[0])
+        return True
+
+    #Sends a line to the GUI
+    def send(self, line):
+        print(line, file=self.output, flush=True)
+
+    #Returns the ChessAI, creating it with the current options if it hasn't been yet
+    def getAI(self):
+        if self.ai is None:
+            self.ai = ChessAI(self.gameState, hashSizeMB=self.hashSizeMB, workers=self.workers)
+        return self.ai
+
+    def uci(self, tokens):
+        self.send("id name " + ENGINE_NAME)
+        self.send("id author " + ENGINE_AUTHOR)
+        self.send("option name Hash type spin default 16 min 1 max 4096")
+        self.send("option name Threads type spin default 1 min 1 max " + str(os.cpu_count() or 1))
+        self.send("uciok")
+
+    def isReady(self, tokens):
+        self.getAI()
+        self.send("readyok")
+
+    #setoption name <name> value <value> - changing the options recreates the ChessAI with the new settings
+    def setOption(self, tokens):
+        if "name" not in tokens or "value" not in tokens:
+            return
+        name = " ".join(tokens[tokens.index("name")+1:tokens.index("value")]).lower()
+        value = " ".join(tokens[tokens.index("value")+1:])
+        if name not in ("hash", "threads"):
+            self.send("info string unknown option " + name)
+            return
+        try:
+            value = max(1, int(value))
+        except ValueError:
+            self.send("info string invalid value " + value)
+            return
+        if name == "hash":
+            self.hashSizeMB = value
+        else:
+            self.workers = value
+        if self.ai is not None:
+            self.stop()
+            self.ai.close()
+            self.ai = None
+
+    #Forgets the previous game's search results
+    def newGame(self, tokens):
+        self.stop()
+        if self.ai is not None:
+            self.ai.transpositionTable.clear()
+            self.ai.evalCache.clear()
+        self.gameState = GameState()
+
+    #position [startpos | fen <fen>] [moves <move1> ... <moveN>]
+    def position(self, tokens):
+        self.stop()
+        moves = tokens[tokens.index("moves")+1:] if "moves" in tokens else []
+        tokens = tokens[:tokens.index("moves")] if "moves" in tokens else tokens
+        try:
+            gameState = GameState.fromFen(" ".join(tokens[1:])) if tokens[:1] == ["fen"] else GameState()
+        except (ValueError, KeyError, IndexError):
+            self.send("info string invalid fen " + " ".join(tokens[1:]))
+            return
+        for uci in moves:
+            try:
+                move = uciToMove(uci)
+            except (KeyError, IndexError):
+                move = None
+            if move not in gameState.getLegalMoves(aiMove=True):
+                self.send("info string illegal move " + uci)
+                break
+            gameState.movePiece(move[0], move[1])
+        self.gameState = gameState
+
+    #go [depth <plies>] [nodes <nodes>] [movetime <ms>] [wtime <ms>] [btime <ms>] [winc <ms>] [binc <ms>] [movestogo <moves>] [infinite]
+    def go(self, tokens):
+        self.stop()
+        limits = {}
+        for name, value in zip(tokens, tokens[1:]):
+            if name in GO_LIMITS:
+                try:
+                    limits[name] = int(value)
+                except ValueError:
+                    self.send("info string invalid value for " + name)
+        infinite = "infinite" in tokens
+        ai = self.getAI()
+        ai.game = ai.gameState = self.gameState
+        ai.depth = max(1, min(limits.get("depth", MAX_DEPTH), MAX_DEPTH))
+        ai.nodeLimit = limits.get("nodes")
+        ai.moveTime = None if infinite else self.moveTime(limits)
+        ai.stopEvent.clear()
+        self.searchThread = threading.Thread(target=self.search, args=(infinite,), daemon=True)
+        self.searchThread.start()
+
+    #Stops the current search (which sends its best move)
+    def stop(self, tokens=None):
+        if self.searchThread is not None:
+            self.ai.stopEvent.set()
+            self.searchThread.join()
+            self.searchThread = None
+
+    #Returns the time to search for (in seconds), from the "go" command's limits (None to search until the depth or node limit is reached)
+    def moveTime(self, limits):
+        if "movetime" in limits:
+            return limits["movetime"] / 1000
+        whiteMove = self.gameState.whiteMove
+        timeLeft = limits.get("wtime" if whiteMove else "btime")
+        if timeLeft is None:
+            return None if "depth" in limits or "nodes" in limits else DEFAULT_MOVE_TIME
+        increment = limits.get("winc" if whiteMove else "binc", 0)
+        budget = min(timeLeft / limits.get("movestogo", MOVES_TO_GO) + increment * INCREMENT_SHARE, timeLeft / 2) / 1000 #never more than half the time left
+        return max(0.01, budget - MOVE_OVERHEAD)
+
+    #Runs in the search thread - searches the position, then sends the search's result and best move
+    def search(self, infinite):
+        ai = self.ai
+        move = ai.search()
+        if infinite: #the best move isn't sent until "stop", even if the search has finished
+            ai.stopEvent.wait()
+        if move is None: #checkmate or stalemate
+            self.send("bestmove 0000")
+            return
+        self.sendInfo()
+        self.send("bestmove " + moveToUci(ai.gameState, move))
+
+    #Sends the depth, score, nodes, time and principal variation of the last completed iteration
+    def sendInfo(self):
+        ai = self.ai
+        elapsed = time.perf_counter() - ai.searchStart
+        pv = ai.principalVariation() or [ai.bestMove]
+        pvMoves = []
+        for move in pv: #each move is converted from the position it's made in
+            pvMoves.append(moveToUci(ai.gameState, move))
+            ai.gameState.movePiece(move[0], move[1])
+        for move in pv:
+            ai.gameState.revMove()
+        info = "info depth {} nodes {} time {} nps {}".format(ai.completedDepth, ai.nodes, int(elapsed * 1000), int(ai.nodes / max(elapsed, 1e-3)))
+        if ai.bestEval is not None:
+            score = ai.bestEval if ai.gameState.whiteMove else -ai.bestEval #UCI scores are from the moving player's point of view (evaluations are white's)
+            if abs(score) >= MATE_SCORE:
+                info += " score mate {}".format(math.ceil(len(pv) / 2) if score > 0 else -(len(pv) // 2))
+            else:
+                info += " score cp {}".format(round(score)) #the network's evaluation units, rather than centipawns
+        self.send(info + " pv " + " ".join(pvMoves))
+
+
+if __name__ == "__main__":
+    UCIEngine().run()
@@ -0,0 +1,82 @@
+#Saving and loading of the trained network's variables - stored as raw float32 data after a small header, so they can be memory-mapped rather than parsed
+import os
+import sys
+import numpy as np
+
+VARIABLE_NAMES = ("dotWs", "dotBs", "dense1Ws", "dense1Bs", "dense2Ws", "dense2Bs", "dense3Ws", "dense3Bs") #order the variables are saved in
+VARIABLE_SHAPES = {"dense1Ws": (1, 2048), "dense2Ws": (2048, 2048), "dense3Ws": (2048, 2048)} #the weight matrices are saved flattened in the text format
+MAGIC = b"SZW1" #identifies the binary format (and its version)
+HEADER_DTYPE = np.dtype("<u4") #header is made of little-endian uint32s: number of variables, then each variable's number of dimensions followed by 2 dimension sizes
+DATA_DTYPE = np.dtype("<f4") #variables are stored as little-endian float32s, one after another in VARIABLE_NAMES order
+DATA_ALIGNMENT = 64 #data starts at a multiple of this offset, so the mapped arrays are aligned
+
+
+#Returns the size in bytes of the header for the given number of variables (including the magic and the padding up to the data)
+def headerSize(variableCount):
+    size = len(MAGIC) + HEADER_DTYPE.itemsize * (1 + 3 * variableCount)
+    return -(-size // DATA_ALIGNMENT) * DATA_ALIGNMENT #rounded up to the alignment
+
+
+#Saves the variables (arrays in VARIABLE_NAMES order) in the binary format
+def saveVariables(variables, path="model1.bin"):
+    variables = [np.asarray(variable, dtype=DATA_DTYPE) for variable in variables]
+    header = [len(variables)]
+    for variable in variables:
+        if variable.ndim > 2:
+            raise ValueError("variables can have at most 2 dimensions, got shape " + str(variable.shape))
+        header += [variable.ndim] + list(variable.shape) + [0] * (2 - variable.ndim) #unused dimensions are padded with 0s
+    header = MAGIC + np.array(header, dtype=HEADER_DTYPE).tobytes()
+    with open(path + ".tmp", "wb") as file: #written to a temporary file first, so a partially written save never replaces a complete one
+        file.write(header.ljust(headerSize(len(variables)), b"\0"))
+        for variable in variables:
+            file.write(variable.tobytes())
+    os.replace(path + ".tmp", path)
+
+
+#Reads the variables from the binary format, returns a dict of float32 arrays (read-only views of the memory-mapped file if mmap is True)
+def readVariables(path="model1.bin", mmap=True):
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(path + " isn't a saved model")
+        variableCount = int(np.frombuffer(file.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)[0])
+        header = np.frombuffer(file.read(HEADER_DTYPE.itemsize * 3 * variableCount), dtype=HEADER_DTYPE).reshape(variableCount, 3)
+    shapes = [tuple(int(size) for size in dimensions[1:1+dimensions[0]]) for dimensions in header]
+    offset = headerSize(variableCount)
+    if mmap:
+        data = np.memmap(path, dtype=DATA_DTYPE, mode="r", offset=offset)
+    else:
+        data = np.fromfile(path, dtype=DATA_DTYPE, offset=offset)
+    variables = {}
+    start = 0
+    for name, shape in zip(VARIABLE_NAMES, shapes):
+        size = int(np.prod(shape))
+        variables[name] = data[start:start+size].reshape(shape)
+        start += size
+    return variables
+
+
+#Reads the variables from the old text save (one variable per line, written as a python list), returns a dict of float32 arrays
+def readTextVariables(path="model1.txt"):
+    variables = {}
+    with open(path, "r") as trainedModel:
+        for name in VARIABLE_NAMES:
+            variable = np.array(trainedModel.readline().rstrip()[1:-1].split(","), dtype=np.float32)
+            variables[name] = variable.reshape(VARIABLE_SHAPES[name]) if name in VARIABLE_SHAPES else variable
+    return variables
+
+
+#Converts a text save of the variables into the binary format
+def convertTextVariables(textPath="model1.txt", path="model1.bin"):
+    variables = readTextVariables(textPath)
+    saveVariables([variables[name] for name in VARIABLE_NAMES], path)
+
+
+#Loads the trained variables, converting the text save first if there isn't a binary one yet
+def loadVariables(path="model1.bin", textPath="model1.txt"):
+    if not os.path.exists(path):
+        convertTextVariables(textPath, path)
+    return readVariables(path)
+
+
+if __name__ == "__main__": #converts a text save: python weights.py [model1.txt] [model1.bin]
+    convertTextVariables(*sys.argv[1:3])